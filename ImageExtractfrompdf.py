@@ -1,11 +1,75 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-import fitz  # PyMuPDF
-from PIL import Image
-import io
+import sys
+import subprocess
+import tempfile
+from PIL import ImageTk
 import zipfile
+import threading
+import time
+from array import array
 from pathlib import Path
+from PDFImageEngine import (COLORSPACE_NAMES, RENDER_COLORSPACES, RENDER_FORMATS, ImageFilter, ZipImageStore,
+                            combine_images_to_pdf, extract_images_parallel, read_image_bytes, render_pages,
+                            zip_path_for)
+from PDFThumbnailCache import ThumbnailCache, ThumbnailLoader
+
+THUMB_SIZE = 48
+ROW_HEIGHT = THUMB_SIZE + 4
+PREVIEW_SIZE = 240
+
+
+def open_path(path):
+    """Open a file or folder with the platform's default application"""
+    if sys.platform == "win32":
+        os.startfile(path)
+    elif sys.platform == "darwin":
+        subprocess.Popen(["open", path])
+    else:
+        subprocess.Popen(["xdg-open", path])
+
+
+class ImageRows:
+    """Extracted image records kept column by column.
+
+    A PDF with tens of thousands of images would otherwise hold one dict per
+    image; rows are only rebuilt as dicts when the list asks for them.
+    """
+    __slots__ = ("filenames", "paths", "hashes", "pages", "sizes", "duplicates")
+    
+    def __init__(self):
+        self.clear()
+        
+    def clear(self):
+        self.filenames = []
+        self.paths = []
+        self.hashes = []
+        self.pages = array('I')
+        self.sizes = array('Q')
+        self.duplicates = bytearray()
+        
+    def append(self, image_info):
+        self.filenames.append(image_info['filename'])
+        self.paths.append(image_info['path'])
+        self.hashes.append(bytes.fromhex(image_info['sha256']))
+        self.pages.append(image_info['page'])
+        self.sizes.append(image_info['size'])
+        self.duplicates.append(image_info['duplicate'])
+        
+    def __len__(self):
+        return len(self.filenames)
+        
+    def __getitem__(self, index):
+        return {
+            'filename': self.filenames[index],
+            'path': self.paths[index],
+            'sha256': self.hashes[index].hex(),
+            'page': self.pages[index],
+            'size': self.sizes[index],
+            'duplicate': bool(self.duplicates[index]),
+        }
+
 
 class PDFImageExtractor:
     def __init__(self, root):
@@ -17,7 +81,32 @@ class PDFImageExtractor:
         # Variables
         self.pdf_path = tk.StringVar()
         self.output_folder = tk.StringVar(value=os.path.join(os.path.expanduser("~"), "PDF_Images"))
-        self.images_info = []
+        self.zip_output = tk.BooleanVar(value=False)
+        self.min_width = tk.StringVar(value="0")
+        self.min_height = tk.StringVar(value="0")
+        self.min_kb = tk.StringVar(value="0")
+        self.page_range = tk.StringVar(value="")
+        self.colorspace = tk.StringVar(value="Any")
+        self.skip_masks = tk.BooleanVar(value=True)
+        self.render_dpi = tk.StringVar(value="150")
+        self.render_format = tk.StringVar(value="png")
+        self.render_colorspace = tk.StringVar(value="RGB")
+        self.combine_resolution = 100.0
+        self.images_info = ImageRows()
+        self.extracting = False
+        
+        # The Treeview only ever holds the rows on screen, starting at top_row
+        self.top_row = 0
+        self.selected_row = None
+        self.header_height = 25
+        
+        # Thumbnails are built off the Tk thread, only for rows on screen
+        self.thumb_cache = ThumbnailCache()
+        self.row_thumbs = {}
+        self.preview_photo = None
+        self.thumb_job = None
+        self.row_loader = ThumbnailLoader(self.thumb_cache, self.thumbnail_ready)
+        self.preview_loader = ThumbnailLoader(self.thumb_cache, self.thumbnail_ready)
         
         # Create output folder if it doesn't exist
         os.makedirs(self.output_folder.get(), exist_ok=True)
@@ -33,7 +122,7 @@ class PDFImageExtractor:
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
         main_frame.columnconfigure(1, weight=1)
-        main_frame.rowconfigure(4, weight=1)
+        main_frame.rowconfigure(6, weight=1)
         
         # PDF selection
         ttk.Label(main_frame, text="PDF File:").grid(row=0, column=0, sticky=tk.W, pady=5)
@@ -57,40 +146,98 @@ class PDFImageExtractor:
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=2, column=0, columnspan=2, pady=10)
         
-        ttk.Button(button_frame, text="Extract Images", command=self.extract_images).pack(side=tk.LEFT, padx=5)
+        self.extract_button = ttk.Button(button_frame, text="Extract Images", command=self.extract_images)
+        self.extract_button.pack(side=tk.LEFT, padx=5)
+        self.render_button = ttk.Button(button_frame, text="Render Pages", command=self.render_pages)
+        self.render_button.pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Combine to PDF", command=self.combine_images_to_pdf).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Open Output Folder", command=self.open_output_folder).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(button_frame, text="Save as ZIP archive", variable=self.zip_output).pack(side=tk.LEFT, padx=5)
+        
+        # Filters - checked against image metadata before anything is decoded
+        filter_frame = ttk.LabelFrame(main_frame, text="Filters", padding="5")
+        filter_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=5)
+        
+        ttk.Label(filter_frame, text="Min width:").pack(side=tk.LEFT)
+        ttk.Entry(filter_frame, textvariable=self.min_width, width=6).pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(filter_frame, text="Min height:").pack(side=tk.LEFT)
+        ttk.Entry(filter_frame, textvariable=self.min_height, width=6).pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(filter_frame, text="Min KB:").pack(side=tk.LEFT)
+        ttk.Entry(filter_frame, textvariable=self.min_kb, width=6).pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(filter_frame, text="Pages:").pack(side=tk.LEFT)
+        ttk.Entry(filter_frame, textvariable=self.page_range, width=8).pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(filter_frame, text="Colors:").pack(side=tk.LEFT)
+        ttk.Combobox(filter_frame, textvariable=self.colorspace, width=6, state="readonly",
+                     values=["Any"] + list(COLORSPACE_NAMES)).pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Checkbutton(filter_frame, text="Skip masks", variable=self.skip_masks).pack(side=tk.LEFT)
+        
+        # Page rendering for scanned PDFs - uses the page range from the filters above
+        render_frame = ttk.LabelFrame(main_frame, text="Page Rendering", padding="5")
+        render_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=5)
+        
+        ttk.Label(render_frame, text="DPI:").pack(side=tk.LEFT)
+        ttk.Entry(render_frame, textvariable=self.render_dpi, width=6).pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(render_frame, text="Format:").pack(side=tk.LEFT)
+        ttk.Combobox(render_frame, textvariable=self.render_format, width=6, state="readonly",
+                     values=list(RENDER_FORMATS)).pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(render_frame, text="Colors:").pack(side=tk.LEFT)
+        ttk.Combobox(render_frame, textvariable=self.render_colorspace, width=6, state="readonly",
+                     values=list(RENDER_COLORSPACES)).pack(side=tk.LEFT, padx=(2, 8))
         
         # Progress bar
         self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
-        self.progress.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=10)
+        self.progress.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=10)
         
         # Results frame
         results_frame = ttk.LabelFrame(main_frame, text="Extracted Images", padding="5")
-        results_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
+        results_frame.grid(row=6, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
         results_frame.columnconfigure(0, weight=1)
         results_frame.rowconfigure(0, weight=1)
         
-        # Treeview to display extracted images
+        # Treeview to display extracted images, with a thumbnail in the tree column
+        ttk.Style().configure("Thumbs.Treeview", rowheight=ROW_HEIGHT)
         columns = ("filename", "page", "size")
-        self.tree = ttk.Treeview(results_frame, columns=columns, show="headings")
+        self.tree = ttk.Treeview(results_frame, columns=columns, show="tree headings", style="Thumbs.Treeview",
+                                 selectmode="browse")
         
         # Define headings
+        self.tree.heading("#0", text="")
         self.tree.heading("filename", text="Filename")
         self.tree.heading("page", text="Page")
         self.tree.heading("size", text="Size")
         
         # Define columns
+        self.tree.column("#0", width=THUMB_SIZE + 20, stretch=False)
         self.tree.column("filename", width=300)
         self.tree.column("page", width=80, anchor=tk.CENTER)
         self.tree.column("size", width=100, anchor=tk.CENTER)
         
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # The scrollbar drives the window of rows instead of scrolling the tree itself
+        self.scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.scroll_rows)
         
         self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.tree.bind("<Configure>", lambda e: self.refresh_rows())
+        self.tree.bind("<<TreeviewSelect>>", self.show_preview)
+        self.tree.bind("<Double-1>", self.open_selected_image)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_rows("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows("scroll", -1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows("scroll", 1, "units"))
+        self.tree.bind("<Up>", lambda e: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self.move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self.move_selection(-self.visible_count()))
+        self.tree.bind("<Next>", lambda e: self.move_selection(self.visible_count()))
+        self.tree.bind("<Home>", lambda e: self.move_selection(-len(self.images_info)))
+        self.tree.bind("<End>", lambda e: self.move_selection(len(self.images_info)))
+        
+        # Preview pane for the selected image
+        preview_frame = ttk.Frame(results_frame, width=PREVIEW_SIZE + 10)
+        preview_frame.grid(row=0, column=2, sticky=(tk.N, tk.S), padx=(5, 0))
+        preview_frame.grid_propagate(False)
+        self.preview_label = ttk.Label(preview_frame, anchor=tk.CENTER)
+        self.preview_label.pack(fill=tk.X, pady=(0, 5))
+        self.preview_caption = ttk.Label(preview_frame, wraplength=PREVIEW_SIZE, justify=tk.CENTER)
+        self.preview_caption.pack(fill=tk.X)
         
         # Status bar
         self.status_var = tk.StringVar(value="Ready")
@@ -110,77 +257,342 @@ class PDFImageExtractor:
         if folder_path:
             self.output_folder.set(folder_path)
             
-    def extract_images(self):
+    def check_pdf(self):
+        if self.extracting:
+            return False
+        
         if not self.pdf_path.get():
             messagebox.showerror("Error", "Please select a PDF file first.")
-            return
+            return False
             
         if not os.path.exists(self.pdf_path.get()):
             messagebox.showerror("Error", "The selected PDF file does not exist.")
+            return False
+        return True
+        
+    def extract_images(self):
+        if not self.check_pdf():
+            return
+        
+        try:
+            image_filter = self.build_filter()
+        except ValueError:
+            messagebox.showerror("Error", "Filters must be whole numbers, and pages like 3 or 2-10.")
             return
             
-        # Clear previous results
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        self.images_info = []
+        self.start_run("Extracting images...", "extract images")
+        self.combine_resolution = 100.0
+        
+        # Run the pipeline on a worker thread so the window stays responsive
+        thread = threading.Thread(
+            target=self.extract_worker,
+            args=(self.pdf_path.get(), self.output_folder.get(), self.zip_output.get(), image_filter)
+        )
+        thread.daemon = True
+        thread.start()
+        
+    def render_pages(self):
+        if not self.check_pdf():
+            return
+        
+        try:
+            dpi = int(self.render_dpi.get())
+            image_filter = self.build_filter()
+        except ValueError:
+            messagebox.showerror("Error", "DPI must be a whole number, and pages like 3 or 2-10.")
+            return
+        if not 10 <= dpi <= 1200:
+            messagebox.showerror("Error", "DPI must be between 10 and 1200.")
+            return
+        
+        self.start_run("Rendering pages...", "render pages")
+        # Combining the renders at their own DPI gives pages the original size
+        self.combine_resolution = float(dpi)
+        
+        thread = threading.Thread(
+            target=self.render_worker,
+            args=(self.pdf_path.get(), self.output_folder.get(), dpi, self.render_colorspace.get(),
+                  self.render_format.get(), image_filter.first_page, image_filter.last_page)
+        )
+        thread.daemon = True
+        thread.start()
+        
+    def start_run(self, status, action):
+        # Clear previous results - only the visible rows exist in the tree
+        self.images_info.clear()
+        self.top_row = 0
+        self.selected_row = None
+        self.row_thumbs = {}
+        self.clear_preview()
+        self.refresh_rows()
             
         # Start progress bar
         self.progress.start()
-        self.status_var.set("Extracting images...")
-        self.root.update()
+        self.busy_status = status
+        self.busy_action = action
+        self.status_var.set(status)
+        self.extract_button.config(state="disabled")
+        self.render_button.config(state="disabled")
+        self.extracting = True
+        self.extract_started = time.perf_counter()
+        self.unique_count = 0
+        self.reused_count = 0
+        
+    def build_filter(self):
+        # Raises ValueError for anything that is not a number or a page range
+        first_page, last_page = 1, None
+        pages = self.page_range.get().strip()
+        if pages:
+            first, _, last = pages.partition("-")
+            first_page = int(first) if first.strip() else 1
+            last_page = int(last) if last.strip() else (None if _ else first_page)
+        
+        colorspace = self.colorspace.get()
+        return ImageFilter(
+            min_width=int(self.min_width.get() or 0),
+            min_height=int(self.min_height.get() or 0),
+            min_bytes=int(self.min_kb.get() or 0) * 1024,
+            colorspaces=None if colorspace == "Any" else [colorspace],
+            first_page=first_page,
+            last_page=last_page,
+            skip_masks=self.skip_masks.get()
+        )
         
+    def extract_worker(self, pdf_path, output_folder, zip_output=False, image_filter=None):
+        # Runs off the Tk thread: results are handed back in batches via after()
+        store = None
         try:
-            pdf_document = fitz.open(self.pdf_path.get())
-            image_count = 0
+            if zip_output:
+                # One STORED archive per PDF instead of a file per image
+                store = ZipImageStore(zip_path_for(pdf_path, output_folder))
+                images = extract_images_parallel(pdf_path, output_folder, writers=1, store=store,
+                                                 image_filter=image_filter)
+            else:
+                # Shared images are decoded once per document and stored once per folder
+                images = extract_images_parallel(pdf_path, output_folder, image_filter=image_filter)
             
-            for page_num in range(len(pdf_document)):
-                page = pdf_document.load_page(page_num)
-                image_list = page.get_images(full=True)
-                
-                for img_index, img in enumerate(image_list):
-                    xref = img[0]
-                    base_image = pdf_document.extract_image(xref)
-                    image_bytes = base_image["image"]
-                    image_ext = base_image["ext"]
-                    
-                    # Generate filename
-                    image_filename = f"image_page{page_num+1}_{img_index+1}.{image_ext}"
-                    image_path = os.path.join(self.output_folder.get(), image_filename)
-                    
-                    # Save image
-                    with open(image_path, "wb") as image_file:
-                        image_file.write(image_bytes)
-                    
-                    # Get file size
-                    file_size = os.path.getsize(image_path)
-                    size_str = self.format_file_size(file_size)
-                    
-                    # Add to treeview
-                    self.tree.insert("", "end", values=(image_filename, page_num+1, size_str))
-                    
-                    # Store image info
-                    self.images_info.append({
-                        'filename': image_filename,
-                        'path': image_path,
-                        'page': page_num + 1,
-                        'index': img_index + 1
-                    })
-                    
-                    image_count += 1
-            
-            pdf_document.close()
-            
-            self.status_var.set(f"Extracted {image_count} images successfully.")
-            messagebox.showinfo("Success", f"Extracted {image_count} images successfully.")
+            self.send_batches(images)
+            if store is not None:
+                store.close()
+                store = None
+            self.root.after(0, self.finish_extract, None)
+        except Exception as e:
+            if store is not None:
+                store.close()
+            self.root.after(0, self.finish_extract, e)
             
+    def render_worker(self, pdf_path, output_folder, dpi, colorspace, fmt, first_page, last_page):
+        report = {}
+        try:
+            self.send_batches(render_pages(pdf_path, output_folder, dpi=dpi, colorspace=colorspace, fmt=fmt,
+                                           first_page=first_page, last_page=last_page, report=report))
+            self.root.after(0, self.finish_extract, None, report)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to extract images: {str(e)}")
-            self.status_var.set("Error extracting images.")
+            self.root.after(0, self.finish_extract, e)
+            
+    def send_batches(self, images):
+        batch = []
+        last_flush = time.perf_counter()
+        for image_info in images:
+            batch.append(image_info)
+            if len(batch) >= 200 or time.perf_counter() - last_flush >= 0.2:
+                self.root.after(0, self.add_image_batch, batch)
+                batch = []
+                last_flush = time.perf_counter()
+        self.root.after(0, self.add_image_batch, batch)
+            
+    def add_image_batch(self, batch):
+        window_filled = len(self.images_info) >= self.top_row + self.visible_count()
+        for image_info in batch:
+            self.images_info.append(image_info)
+            
+            if not image_info['duplicate']:
+                self.unique_count += 1
+                if image_info['reused']:
+                    self.reused_count += 1
         
-        finally:
-            self.progress.stop()
+        self.status_var.set(f"{self.busy_status} {len(self.images_info)} so far")
+        # New rows land below the window once it is full; then only the scrollbar changes
+        if window_filled:
+            self.update_scrollbar()
+        else:
+            self.refresh_rows()
+        
+    def finish_extract(self, error, render_report=None):
+        self.progress.stop()
+        self.extract_button.config(state="normal")
+        self.render_button.config(state="normal")
+        self.extracting = False
+        
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to {self.busy_action}: {str(error)}")
+            self.status_var.set(f"Error: could not {self.busy_action}.")
+            return
+        
+        # ZIP members only become readable once the archive is closed
+        self.schedule_thumbnails()
+        
+        elapsed = time.perf_counter() - self.extract_started
+        if render_report is not None:
+            message = f"Rendered {render_report['pages']} pages ({render_report['pages_per_sec']} pages/sec)."
+            self.status_var.set(f"{message} Took {elapsed:.1f}s.")
+            messagebox.showinfo("Success", message)
+            return
+        
+        image_count = len(self.images_info)
+        message = f"Extracted {image_count} images successfully ({self.unique_count} unique files"
+        if self.reused_count:
+            message += f", {self.reused_count} already extracted by an earlier run"
+        message += ")."
+        self.status_var.set(f"{message} Took {elapsed:.1f}s.")
+        messagebox.showinfo("Success", message)
+            
+    # ---------- Virtual list ----------
+    def visible_count(self):
+        return max(1, (self.tree.winfo_height() - self.header_height) // ROW_HEIGHT)
+        
+    def refresh_rows(self):
+        """Rebuild the tree from the visible window of images_info - O(visible rows)"""
+        total = len(self.images_info)
+        count = self.visible_count()
+        self.top_row = max(0, min(self.top_row, total - count))
+        
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        for index in range(self.top_row, min(total, self.top_row + count)):
+            iid = str(index)
+            self.tree.insert("", "end", iid=iid, image=self.row_thumbs.get(iid, ""), values=(
+                self.images_info.filenames[index],
+                self.images_info.pages[index],
+                self.format_file_size(self.images_info.sizes[index])
+            ))
+        
+        children = self.tree.get_children()
+        if children:
+            bbox = self.tree.bbox(children[0])
+            if bbox:
+                self.header_height = bbox[1]
+        if self.selected_row is not None and self.tree.exists(str(self.selected_row)):
+            self.tree.selection_set(str(self.selected_row))
+            self.tree.focus(str(self.selected_row))
+        self.update_scrollbar()
+        self.schedule_thumbnails()
+        
+    def update_scrollbar(self):
+        total = len(self.images_info)
+        if total == 0:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.top_row / total, min(1.0, (self.top_row + self.visible_count()) / total))
+            
+    def scroll_rows(self, action, amount, unit=None):
+        # Same arguments as a Scrollbar command: ("moveto", fraction) or ("scroll", n, "units"/"pages")
+        if action == "moveto":
+            top = int(float(amount) * len(self.images_info))
+        elif unit == "pages":
+            top = self.top_row + int(amount) * self.visible_count()
+        else:
+            top = self.top_row + int(amount) * 3
+        top = max(0, min(top, len(self.images_info) - self.visible_count()))
+        if top != self.top_row:
+            self.top_row = top
+            self.refresh_rows()
+        return "break"
+        
+    def move_selection(self, delta):
+        if not len(self.images_info):
+            return "break"
+        current = self.top_row if self.selected_row is None else self.selected_row
+        self.selected_row = max(0, min(current + delta, len(self.images_info) - 1))
+        
+        # Scroll just enough to keep the selected row in the window
+        count = self.visible_count()
+        if self.selected_row < self.top_row:
+            self.top_row = self.selected_row
+        elif self.selected_row >= self.top_row + count:
+            self.top_row = self.selected_row - count + 1
+        self.refresh_rows()
+        self.show_preview()
+        return "break"
+        
+    # ---------- Thumbnails and preview ----------
+    def schedule_thumbnails(self):
+        # Scrolling fires many events; only look at the visible rows once they settle
+        if self.thumb_job is None:
+            self.thumb_job = self.root.after(50, self.request_thumbnails)
+            
+    def request_thumbnails(self):
+        self.thumb_job = None
+        visible = self.tree.get_children()
+        
+        # Let go of thumbnails that scrolled out of view
+        for iid in set(self.row_thumbs) - set(visible):
+            del self.row_thumbs[iid]
+        
+        wanted = []
+        for iid in visible:
+            if iid not in self.row_thumbs:
+                index = int(iid)
+                wanted.append((("row", iid), self.images_info.hashes[index].hex(), self.images_info.paths[index]))
+        self.row_loader.request(wanted, THUMB_SIZE)
+        
+    def thumbnail_ready(self, key, thumb):
+        # Called on a loader thread; PhotoImages must be made on the Tk thread
+        if thumb is not None:
+            self.root.after(0, self.show_thumbnail, key, thumb)
+            
+    def show_thumbnail(self, key, thumb):
+        kind, ident = key
+        if kind == "row":
+            if self.tree.exists(ident):
+                self.row_thumbs[ident] = ImageTk.PhotoImage(thumb)
+                self.tree.item(ident, image=self.row_thumbs[ident])
+        elif self.selected_row == ident:
+            self.preview_photo = ImageTk.PhotoImage(thumb)
+            self.preview_label.config(image=self.preview_photo)
+            
+    def show_preview(self, event=None):
+        # Rebuilding the window clears the tree's selection; the selected row lives in selected_row
+        selection = self.tree.selection()
+        if event is not None:
+            if not selection or int(selection[0]) == self.selected_row:
+                return
+            self.selected_row = int(selection[0])
+        if self.selected_row is None:
+            return
+        image_info = self.images_info[self.selected_row]
+        self.preview_caption.config(
+            text=f"{image_info['filename']}\nPage {image_info['page']}, "
+                 f"{self.format_file_size(image_info['size'])}"
+        )
+        self.preview_loader.request([(("preview", self.selected_row), image_info['sha256'], image_info['path'])],
+                                    PREVIEW_SIZE)
+        
+    def clear_preview(self):
+        self.preview_photo = None
+        self.preview_label.config(image="")
+        self.preview_caption.config(text="")
+        
+    def open_selected_image(self, event=None):
+        if self.selected_row is not None:
+            path = self.images_info.paths[self.selected_row]
+            if not os.path.isfile(path):
+                # Images stored in a ZIP are opened from a temporary copy
+                try:
+                    data = read_image_bytes(path)
+                except (OSError, KeyError, zipfile.BadZipFile):
+                    return
+                path = os.path.join(tempfile.mkdtemp(prefix="pdfimage_"), os.path.basename(path))
+                with open(path, "wb") as f:
+                    f.write(data)
+            open_path(path)
             
     def combine_images_to_pdf(self):
+        if self.extracting:
+            messagebox.showwarning("Warning", "Please wait for the extraction to finish.")
+            return
+            
         if not self.images_info:
             messagebox.showwarning("Warning", "No images to combine. Please extract images first.")
             return
@@ -201,23 +613,14 @@ class PDFImageExtractor:
         self.root.update()
         
         try:
-            images = []
-            for img_info in self.images_info:
-                img_path = img_info['path']
-                if os.path.exists(img_path):
-                    img = Image.open(img_path)
-                    if img.mode == 'RGBA':
-                        img = img.convert('RGB')
-                    images.append(img)
-            
-            if images:
-                images[0].save(
-                    output_pdf, "PDF", 
-                    resolution=100.0, 
-                    save_all=True, 
-                    append_images=images[1:]
-                )
-                
+            # Images are streamed into the PDF one page at a time instead of all being held open
+            page_count = combine_images_to_pdf(
+                self.images_info.paths,
+                output_pdf,
+                resolution=self.combine_resolution
+            )
+            
+            if page_count:
                 self.status_var.set(f"PDF created successfully: {os.path.basename(output_pdf)}")
                 messagebox.showinfo("Success", f"PDF created successfully: {output_pdf}")
             else:
@@ -233,7 +636,7 @@ class PDFImageExtractor:
     def open_output_folder(self):
         output_path = self.output_folder.get()
         if os.path.exists(output_path):
-            os.startfile(output_path)  # Works on Windows
+            open_path(output_path)
         else:
             messagebox.showwarning("Warning", "Output folder does not exist.")
             
@@ -0,0 +1,165 @@
+"""Pluggable text extraction backends for PDFextractEngine.
+
+PyMuPDF (fitz, already used by ImageExtractfrompdf.py) extracts text much
+faster than PyPDF2, but PyPDF2 is pure Python and copes with some files that
+PyMuPDF does not. PDFDocument opens a file with the preferred backend and, page
+by page, falls back to the next one when a backend raises or returns no text.
+It keeps a per-backend report of pages served and time spent.
+"""
+import time
+
+from PyPDF2 import PdfReader
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+
+class PyPDF2Backend:
+    name = "pypdf2"
+
+    def __init__(self, filename):
+        self._file = open(filename, "rb")
+        try:
+            self._reader = PdfReader(self._file)
+            self.page_count = len(self._reader.pages)
+        except Exception:
+            self._file.close()
+            raise
+
+    def page_text(self, page_no):
+        return self._reader.pages[page_no - 1].extract_text() or ""
+
+    def close(self):
+        self._file.close()
+
+
+class PyMuPDFBackend:
+    name = "pymupdf"
+
+    def __init__(self, filename):
+        if fitz is None:
+            raise RuntimeError("PyMuPDF is not installed")
+        self._doc = fitz.open(filename)
+        self.page_count = len(self._doc)
+
+    def page_text(self, page_no):
+        return self._doc.load_page(page_no - 1).get_text() or ""
+
+    def close(self):
+        self._doc.close()
+
+
+# Fastest first; "auto" tries them in this order
+BACKENDS = {
+    "pymupdf": PyMuPDFBackend,
+    "pypdf2": PyPDF2Backend,
+}
+BACKEND_CHOICES = ["auto"] + list(BACKENDS)
+
+
+def available_backends():
+    return [name for name in BACKENDS if name != "pymupdf" or fitz is not None]
+
+
+def backend_order(backend="auto", fallback=True):
+    """Return the backend names to try, preferred one first"""
+    if backend == "auto":
+        names = available_backends()
+    elif backend in BACKENDS:
+        names = [backend] + [name for name in available_backends() if name != backend]
+    else:
+        raise ValueError(f"Unknown PDF backend: {backend}")
+    return names if fallback else names[:1]
+
+
+def merge_report(into, report):
+    """Add the counters of one backend report into another (either may be None)"""
+    if into is None or not report:
+        return
+    for name, counts in report.items():
+        total = into.setdefault(name, {'pages': 0, 'empty': 0, 'errors': 0, 'seconds': 0.0})
+        for key, value in counts.items():
+            total[key] += value
+
+
+class PDFDocument:
+    """A PDF opened through one or more backends, with per-page fallback"""
+
+    def __init__(self, filename, backend="auto", fallback=True):
+        self.filename = filename
+        self.report = {}
+        self._order = backend_order(backend, fallback)
+        self._backends = {}
+        self._errors = {}
+
+        # Open eagerly with the first backend that accepts the file
+        error = None
+        for name in self._order:
+            if self._backend(name) is not None:
+                self.backend_name = name
+                self.page_count = self._backends[name].page_count
+                return
+            error = self._errors.get(name)
+        raise error or RuntimeError("No PDF backend is available")
+
+    def _backend(self, name):
+        # Fallback backends are only opened the first time they are needed
+        if name not in self._backends:
+            counts = self._counts(name)
+            start = time.perf_counter()
+            try:
+                self._backends[name] = BACKENDS[name](self.filename)
+            except Exception as e:
+                self._backends[name] = None
+                self._errors[name] = e
+                counts['errors'] += 1
+            counts['seconds'] += time.perf_counter() - start
+        return self._backends[name]
+
+    def _counts(self, name):
+        return self.report.setdefault(name, {'pages': 0, 'empty': 0, 'errors': 0, 'seconds': 0.0})
+
+    def page_text(self, page_no):
+        """Return a page's text from the first backend that produces any"""
+        for name in self._order:
+            backend = self._backend(name)
+            if backend is None:
+                continue
+
+            counts = self._counts(name)
+            start = time.perf_counter()
+            try:
+                text = backend.page_text(page_no)
+            except Exception:
+                counts['errors'] += 1
+                continue
+            finally:
+                counts['seconds'] += time.perf_counter() - start
+
+            if text.strip():
+                counts['pages'] += 1
+                return text
+            counts['empty'] += 1
+        return ""
+
+    def close(self):
+        for backend in self._backends.values():
+            if backend is not None:
+                backend.close()
+        self._backends.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def format_report(report):
+    """One line per backend, e.g. 'pymupdf: 120 pages, 2 empty, 0 errors in 0.41s'"""
+    return "\n".join(
+        f"{name}: {c['pages']} pages, {c['empty']} empty, {c['errors']} errors in {c['seconds']:.2f}s"
+        for name, c in report.items()
+    )
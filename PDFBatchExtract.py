@@ -0,0 +1,149 @@
+"""Batch text extraction for whole folder trees of PDFs.
+
+Every PDF under the input folder is extracted by a bounded pool of worker
+processes into a matching .txt file under the output folder. Each finished
+file is appended to a manifest (one JSON record per line) in the output
+folder, so an interrupted run picks up where it stopped: files already listed
+as done with the same size and modification time are skipped.
+
+Command line usage:
+    python PDFBatchExtract.py input_folder output_folder --jobs 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from PDFextractEngine import extract_to_file, iter_pdf_paths
+
+MANIFEST_NAME = ".pdfextract_manifest.jsonl"
+
+
+# ---------- Manifest ----------
+def load_manifest(manifest_path):
+    """Return {relative source path: record} for files the manifest lists as done"""
+    done = {}
+    if not os.path.exists(manifest_path):
+        return done
+
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A run killed mid-write can leave a torn last line
+                continue
+            if record.get('status') == "done":
+                done[record['source']] = record
+            else:
+                done.pop(record.get('source'), None)
+    return done
+
+
+def is_up_to_date(record, stat):
+    return record['size'] == stat.st_size and record['mtime'] == stat.st_mtime
+
+
+# ---------- Worker ----------
+def _extract_one(source, target):
+    # Runs in a worker process. Write to a temp file first so an interrupted
+    # run never leaves a truncated .txt that looks finished.
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    partial = target + ".part"
+    start = time.perf_counter()
+    try:
+        pages = extract_to_file(source, partial)
+    except Exception:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.replace(partial, target)
+    return pages, time.perf_counter() - start
+
+
+# ---------- Batch run ----------
+def run_batch(input_dir, output_dir, workers=None, on_progress=None):
+    """Extract every PDF under input_dir. Returns a dict of counters."""
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    done = load_manifest(manifest_path)
+
+    counts = {'done': 0, 'skipped': 0, 'failed': 0}
+
+    with open(manifest_path, "a", encoding="utf-8") as manifest, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+
+        def finish(future):
+            rel, stat = pending.pop(future)
+            record = {'source': rel, 'size': stat.st_size, 'mtime': stat.st_mtime}
+            try:
+                pages, seconds = future.result()
+                record.update(status="done", pages=pages, seconds=round(seconds, 3))
+                counts['done'] += 1
+            except Exception as e:
+                record.update(status="error", error=str(e))
+                counts['failed'] += 1
+            manifest.write(json.dumps(record) + "\n")
+            manifest.flush()
+            if on_progress:
+                on_progress(record, counts)
+
+        pending = {}
+        for source in iter_pdf_paths([input_dir]):
+            rel = os.path.relpath(source, input_dir)
+            stat = os.stat(source)
+            if rel in done and is_up_to_date(done[rel], stat):
+                counts['skipped'] += 1
+                continue
+
+            target = os.path.join(output_dir, os.path.splitext(rel)[0] + ".txt")
+            pending[pool.submit(_extract_one, source, target)] = (rel, stat)
+
+            # Keep the queue bounded so a 100k-file tree is not all submitted at once
+            if len(pending) >= workers * 4:
+                finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    finish(future)
+
+        while pending:
+            finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in finished:
+                finish(future)
+
+    return counts
+
+
+# ---------- CLI ----------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Extract text from every PDF in a folder tree.")
+    parser.add_argument("input_dir", help="folder to scan for PDFs (recursively)")
+    parser.add_argument("output_dir", help="folder to write .txt files and the manifest to")
+    parser.add_argument("-j", "--jobs", type=int, default=0,
+                        help="worker processes to use (0 = one per CPU core)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print the final summary")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    def report(record, counts):
+        if record['status'] == "done":
+            print(f"[{counts['done']}] {record['source']} ({record['pages']} pages)", file=sys.stderr)
+        else:
+            print(f"FAILED {record['source']}: {record['error']}", file=sys.stderr)
+
+    start = time.perf_counter()
+    counts = run_batch(args.input_dir, args.output_dir, args.jobs or None,
+                       on_progress=None if args.quiet else report)
+    elapsed = time.perf_counter() - start
+    print(f"Extracted {counts['done']}, skipped {counts['skipped']} already done, "
+          f"{counts['failed']} failed in {elapsed:.1f}s")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,930 @@
+"""Headless image extraction engine for ImageExtractfrompdf.py.
+
+Images are deduplicated twice: by xref within a document, so an image object
+shared by hundreds of pages is decoded once, and by content hash across
+documents, so identical bytes are only ever stored once per output folder.
+Every page occurrence is still recorded in the folder's manifest together
+with the single stored file it maps to.
+
+The manifest also makes re-runs incremental. Documents are identified by the
+SHA-256 of the PDF and each gets its own subfolder, so PDFs sharing an output
+folder never collide. A PDF whose last run completed with the same filter is
+answered straight from the manifest; after an interrupted run only the xrefs
+that were not stored yet are decoded again.
+
+extract_images_parallel() runs the same extraction as a pipeline: page-range
+workers in a process pool pull image bytes out of the PDF, and a thread pool
+writes the new files, so throughput scales with cores and disks.
+
+render_pages() is for scanned PDFs, where the page itself is the picture:
+whole pages are rasterized with get_pixmap across a process pool and written
+as PNG, JPEG or WebP files that the combine step can take straight back.
+
+combine_images_to_pdf() goes the other way and builds a PDF from image files
+one page at a time, with memory bounded by a handful of images. JPEG, JPEG
+2000 and most PNG files are embedded byte-for-byte instead of being decoded
+and re-encoded.
+
+ImageFilter rejects images on metadata alone (dimensions, stored size,
+colorspace, page range, masks) before any bytes are decoded, so icons and
+spacers cost next to nothing.
+
+ZipImageStore is a drop-in replacement for ImageStore that streams the images
+of one PDF into a single uncompressed ZIP archive instead of loose files.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from PDFTextCache import file_digest
+
+MANIFEST_NAME = "image_manifest.jsonl"
+
+
+class ImageStore:
+    """Content-addressed store of extracted images in one output folder.
+
+    The manifest is an append-only JSONL file with four kinds of records:
+    "image" (one per stored file), "occurrence" (one per image on a page),
+    "start" and "document" (the beginning and the end of a run over one PDF,
+    keyed by the PDF's SHA-256).
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.manifest_path = os.path.join(folder, MANIFEST_NAME)
+        self._init_index()
+        os.makedirs(folder, exist_ok=True)
+        self._load()
+        self._manifest = open(self.manifest_path, "a", encoding="utf-8")
+
+    def _init_index(self):
+        self._by_hash = {}
+        self._by_file = {}        # stored file -> (sha256, size)
+        self._reserved = set()
+        self._xrefs = {}          # pdf sha256 -> {xref: stored file}
+        self._occurrences = {}    # pdf sha256 -> {(page, index): (xref, stored file)} of the latest run
+        self._documents = {}      # pdf sha256 -> filter signature of its last complete run
+        self._known_hashes = {}   # (path, size, mtime) -> pdf sha256
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                kind = record.get('type')
+                if kind == "image":
+                    # Files deleted by hand are simply written again
+                    if os.path.exists(os.path.join(self.folder, record['file'])):
+                        self._by_hash[record['sha256']] = record['file']
+                        self._by_file[record['file']] = (record['sha256'], record['size'])
+                elif 'pdf_sha256' not in record:
+                    continue  # written before runs were tracked per document
+                elif kind == "occurrence":
+                    pdf_hash = record['pdf_sha256']
+                    self._xrefs.setdefault(pdf_hash, {})[record['xref']] = record['file']
+                    self._occurrences.setdefault(pdf_hash, {})[record['page'], record['index']] = (
+                        record['xref'], record['file'])
+                elif kind == "start":
+                    self._occurrences.pop(record['pdf_sha256'], None)
+                    self._documents.pop(record['pdf_sha256'], None)
+                elif kind == "document":
+                    self._documents[record['pdf_sha256']] = record['filter']
+                    self._known_hashes[record['pdf'], record['size'], record['mtime']] = record['pdf_sha256']
+
+    def add(self, image_bytes, filename):
+        """Store image bytes under `filename` unless identical bytes are already stored.
+
+        Returns (stored filename, sha256, is_new).
+        """
+        filename, sha256, is_new = self.reserve(image_bytes, filename)
+        if is_new:
+            self.write(image_bytes, filename)
+        return filename, sha256, is_new
+
+    def reserve(self, image_bytes, filename):
+        """Claim a file name for these bytes without writing them yet.
+
+        Safe to call from several threads; when is_new is True the caller must
+        follow up with write(). Returns (stored filename, sha256, is_new).
+        """
+        sha256 = hashlib.sha256(image_bytes).hexdigest()
+        with self._lock:
+            stored = self._by_hash.get(sha256)
+            if stored is not None:
+                return stored, sha256, False
+
+            filename = self._unique_name(filename)
+            self._reserved.add(filename)
+            self._by_hash[sha256] = filename
+            self._by_file[filename] = (sha256, len(image_bytes))
+            self._write({'type': "image", 'sha256': sha256, 'file': filename, 'size': len(image_bytes)})
+            return filename, sha256, True
+
+    def write(self, image_bytes, filename):
+        # Write then rename, so a killed run never leaves a truncated image behind
+        path = os.path.join(self.folder, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".part", "wb") as image_file:
+            image_file.write(image_bytes)
+        os.replace(path + ".part", path)
+
+    def path_for(self, filename):
+        return os.path.join(self.folder, filename)
+
+    def _name_taken(self, filename):
+        return os.path.exists(os.path.join(self.folder, filename))
+
+    def _unique_name(self, filename):
+        # Never overwrite a stored file that holds different bytes
+        stem, ext = os.path.splitext(filename)
+        n = 1
+        while filename in self._reserved or self._name_taken(filename):
+            n += 1
+            filename = f"{stem}_{n}{ext}"
+        return filename
+
+    def record_occurrence(self, pdf_path, page, index, xref, filename, pdf_hash=None):
+        with self._lock:
+            if pdf_hash is not None:
+                self._xrefs.setdefault(pdf_hash, {})[xref] = filename
+                self._occurrences.setdefault(pdf_hash, {})[page, index] = (xref, filename)
+            self._write({
+                'type': "occurrence",
+                'pdf': os.path.abspath(pdf_path),
+                'pdf_sha256': pdf_hash,
+                'page': page,
+                'index': index,
+                'xref': xref,
+                'file': filename
+            })
+
+    # ---------- Documents ----------
+    def document_hash(self, pdf_path):
+        """Return a PDF's SHA-256, reusing the manifest's value while the file is unchanged"""
+        path = os.path.abspath(pdf_path)
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime)
+        with self._lock:
+            pdf_hash = self._known_hashes.get(key)
+        if pdf_hash is None:
+            pdf_hash = file_digest(path)
+            with self._lock:
+                self._known_hashes[key] = pdf_hash
+        return pdf_hash
+
+    def document_prefix(self, pdf_path, pdf_hash):
+        """Subfolder (with trailing slash) that holds the images of one document"""
+        stem = os.path.splitext(os.path.basename(pdf_path))[0]
+        return f"{stem}_{pdf_hash[:8]}/"
+
+    def completed_run(self, pdf_hash, signature):
+        """Return the info dicts of the last complete run over a PDF with the same filter.
+
+        Returns None if there was none, or if any of its files have gone missing.
+        """
+        with self._lock:
+            if pdf_hash not in self._documents or self._documents[pdf_hash] != signature:
+                return None
+            occurrences = sorted(self._occurrences.get(pdf_hash, {}).items())
+            if any(filename not in self._by_file for _key, (_xref, filename) in occurrences):
+                return None
+
+            infos = []
+            listed = set()
+            for (page, index), (xref, filename) in occurrences:
+                sha256, size = self._by_file[filename]
+                infos.append(_image_info(self, filename, page, index, xref, sha256, size,
+                                         duplicate=filename in listed, reused=True))
+                listed.add(filename)
+            return infos
+
+    def known_xrefs(self, pdf_hash):
+        """Xrefs of a PDF whose images an earlier run already stored"""
+        with self._lock:
+            return frozenset(xref for xref, filename in self._xrefs.get(pdf_hash, {}).items()
+                             if filename in self._by_file)
+
+    def known_image(self, pdf_hash, xref):
+        """Return (filename, sha256, size) for an xref stored by an earlier run, or None"""
+        with self._lock:
+            filename = self._xrefs.get(pdf_hash, {}).get(xref)
+            if filename not in self._by_file:
+                return None
+            return (filename,) + self._by_file[filename]
+
+    def start_document(self, pdf_path, pdf_hash):
+        # Occurrences of earlier runs stop counting; stored xrefs are still reused
+        with self._lock:
+            self._occurrences.pop(pdf_hash, None)
+            self._documents.pop(pdf_hash, None)
+            self._write({'type': "start", 'pdf': os.path.abspath(pdf_path), 'pdf_sha256': pdf_hash})
+
+    def finish_document(self, pdf_path, pdf_hash, signature):
+        path = os.path.abspath(pdf_path)
+        stat = os.stat(path)
+        with self._lock:
+            self._documents[pdf_hash] = signature
+            self._write({'type': "document", 'pdf': path, 'pdf_sha256': pdf_hash,
+                         'size': stat.st_size, 'mtime': stat.st_mtime, 'filter': signature})
+            self._manifest.flush()
+
+    def _write(self, record):
+        self._manifest.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self._manifest.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ZipImageStore(ImageStore):
+    """Streams extracted images of one PDF straight into a ZIP archive.
+
+    Members are STORED, not deflated: the images are already compressed, so
+    this is a single sequential write instead of thousands of small-file
+    creates. Identical images are stored once; the manifest is added as the
+    last member when the store is closed.
+    """
+
+    def __init__(self, zip_path):
+        self.zip_path = zip_path
+        self.folder = os.path.dirname(os.path.abspath(zip_path))
+        self._init_index()
+        os.makedirs(self.folder, exist_ok=True)
+        self._zip = zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED, allowZip64=True)
+        # Occurrences can run into the hundreds of thousands, so buffer them on disk
+        self._manifest = tempfile.TemporaryFile("w+", encoding="utf-8")
+
+    def write(self, image_bytes, filename):
+        info = zipfile.ZipInfo(filename, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        with self._lock:
+            self._zip.writestr(info, image_bytes)
+
+    def path_for(self, filename):
+        return os.path.join(self.zip_path, filename)
+
+    def document_prefix(self, pdf_path, pdf_hash):
+        # The archive already belongs to a single document
+        return ""
+
+    def _name_taken(self, filename):
+        return False
+
+    def close(self):
+        with self._lock:
+            self._manifest.seek(0)
+            info = zipfile.ZipInfo(MANIFEST_NAME, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with self._zip.open(info, "w") as member:
+                for line in self._manifest:
+                    member.write(line.encode("utf-8"))
+            self._manifest.close()
+            self._zip.close()
+
+
+COLORSPACE_COMPONENTS = {
+    "DeviceGray": 1, "CalGray": 1,
+    "DeviceRGB": 3, "CalRGB": 3, "Lab": 3,
+    "DeviceCMYK": 4,
+}
+COLORSPACE_NAMES = {"Gray": 1, "RGB": 3, "CMYK": 4}
+
+
+class ImageFilter:
+    """Rules that decide from metadata alone whether an image is worth extracting.
+
+    Everything is checked against the get_images(full=True) tuple and the
+    image's xref dictionary, so rejected icons and spacers are never decoded.
+    `colorspaces` takes names from COLORSPACE_NAMES ("Gray", "RGB", "CMYK").
+    Zero / None means no limit.
+    """
+
+    def __init__(self, min_width=0, min_height=0, min_bytes=0, colorspaces=None,
+                 first_page=1, last_page=None, skip_masks=False):
+        self.min_width = min_width
+        self.min_height = min_height
+        self.min_bytes = min_bytes
+        self.colorspaces = {COLORSPACE_NAMES[name] for name in colorspaces} if colorspaces else None
+        self.first_page = first_page
+        self.last_page = last_page
+        self.skip_masks = skip_masks
+
+    def signature(self):
+        """JSON-friendly form of the rules, stored with each completed run"""
+        rules = dict(vars(self))
+        rules['colorspaces'] = sorted(self.colorspaces) if self.colorspaces else None
+        return rules
+
+    def page_range(self, total_pages):
+        """Return the (first, last) pages to scan, 1-based and inclusive"""
+        last = total_pages if self.last_page is None else min(self.last_page, total_pages)
+        return max(self.first_page, 1), last
+
+    def accepts(self, pdf_document, img, mask_xrefs=()):
+        xref, _smask, width, height, _bpc, colorspace = img[:6]
+        if width < self.min_width or height < self.min_height:
+            return False
+        if self.colorspaces and _colorspace_components(pdf_document, xref, colorspace) not in self.colorspaces:
+            return False
+        if self.skip_masks:
+            # Soft masks of other images on the page, and stencil masks
+            if xref in mask_xrefs or pdf_document.xref_get_key(xref, "ImageMask")[1] == "true":
+                return False
+        if self.min_bytes and _stream_length(pdf_document, xref) < self.min_bytes:
+            return False
+        return True
+
+
+def _colorspace_components(pdf_document, xref, colorspace):
+    # Named device spaces are known; anything else is read from the image's /ColorSpace
+    if colorspace in COLORSPACE_COMPONENTS:
+        return COLORSPACE_COMPONENTS[colorspace]
+    kind, value = pdf_document.xref_get_key(xref, "ColorSpace")
+    if kind == "xref":
+        value = pdf_document.xref_object(int(value.split()[0]))
+    return _colorspace_source_components(pdf_document, value)
+
+
+def _colorspace_source_components(pdf_document, value):
+    # `value` is a colorspace as PDF source, e.g. /DeviceGray or [/Indexed/DeviceRGB 255<...>]
+    match = re.match(r"\s*\[?\s*/(\w+)\s*(.*)", value, re.DOTALL)
+    if not match:
+        return None
+    name, rest = match.groups()
+    reference = re.match(r"(\d+)\s+\d+\s+R", rest)
+    if name in COLORSPACE_COMPONENTS:
+        return COLORSPACE_COMPONENTS[name]
+    if name == "ICCBased":
+        # ICC profiles carry their component count as /N in the profile stream
+        if not reference:
+            return None
+        kind, value = pdf_document.xref_get_key(int(reference.group(1)), "N")
+        return int(value) if kind == "int" else None
+    if name == "Indexed":
+        # Palette entries are colours of the base space, which may be another object
+        if reference:
+            rest = pdf_document.xref_object(int(reference.group(1)))
+        return _colorspace_source_components(pdf_document, rest)
+    if name == "Separation":
+        return 1
+    if name == "DeviceN":
+        colorants = re.match(r"\[([^\]]*)\]", rest)
+        return len(re.findall(r"/[^\s/]+", colorants.group(1))) if colorants else None
+    return None
+
+
+def _stream_length(pdf_document, xref):
+    # Compressed size straight from the dictionary; /Length may be an indirect object
+    kind, value = pdf_document.xref_get_key(xref, "Length")
+    if kind == "xref":
+        value = pdf_document.xref_object(int(value.split()[0])).strip()
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+
+def _page_images(pdf_document, page_num, image_filter):
+    """Yield (img_index, img) for the images on a page that pass the filter.
+
+    img_index keeps counting over all images, so file names stay the same
+    whatever the filter.
+    """
+    image_list = pdf_document.load_page(page_num).get_images(full=True)
+    mask_xrefs = {img[1] for img in image_list if img[1]}
+    for img_index, img in enumerate(image_list):
+        if image_filter is None or image_filter.accepts(pdf_document, img, mask_xrefs):
+            yield img_index, img
+
+
+def _image_info(store, filename, page, index, xref, sha256, size, duplicate, reused=False):
+    # 'reused' marks images an earlier run had already stored
+    return {
+        'filename': filename,
+        'path': store.path_for(filename),
+        'page': page,
+        'index': index,
+        'xref': xref,
+        'sha256': sha256,
+        'size': size,
+        'duplicate': duplicate,
+        'reused': reused
+    }
+
+
+def read_image_bytes(path, archives=None):
+    """Return the bytes of an extracted image, stored as a file or inside a ZIP.
+
+    ZipImageStore paths look like <archive.zip>/<member>. Pass a dict as
+    `archives` to keep archives open between calls; the caller closes them.
+    """
+    if os.path.isfile(path):
+        with open(path, "rb") as f:
+            return f.read()
+    archive, member = os.path.split(path)
+    if archives is None:
+        with zipfile.ZipFile(archive) as zf:
+            return zf.read(member)
+    if archive not in archives:
+        archives[archive] = zipfile.ZipFile(archive)
+    return archives[archive].read(member)
+
+
+def zip_path_for(pdf_path, output_folder):
+    """Default archive name for a PDF's images: <output_folder>/<pdf name>_images.zip"""
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(output_folder, f"{stem}_images.zip")
+
+
+def iter_extract_images(pdf_path, output_folder, store=None, image_filter=None):
+    """Write every embedded image of a PDF to output_folder, deduplicated.
+
+    Yields one info dict per page occurrence so callers (the GUI, benchmarks)
+    can report progress as they go. 'duplicate' is True when the occurrence
+    maps to a file that was already stored. Images rejected by `image_filter`
+    (an ImageFilter) are skipped before they are decoded. Work recorded in the
+    store's manifest by earlier runs over the same PDF is not repeated.
+    """
+    own_store = store is None
+    if own_store:
+        store = ImageStore(output_folder)
+
+    pdf_document = None
+    try:
+        pdf_hash = store.document_hash(pdf_path)
+        signature = None if image_filter is None else image_filter.signature()
+        done = store.completed_run(pdf_hash, signature)
+        if done is not None:
+            yield from done
+            return
+
+        store.start_document(pdf_path, pdf_hash)
+        prefix = store.document_prefix(pdf_path, pdf_hash)
+        skip_xrefs = store.known_xrefs(pdf_hash)
+        pdf_document = fitz.open(pdf_path)
+        seen_xrefs = {}
+        first, last = (1, len(pdf_document)) if image_filter is None else image_filter.page_range(len(pdf_document))
+        for page_num in range(first - 1, last):
+            for img_index, img in _page_images(pdf_document, page_num, image_filter):
+                xref = img[0]
+
+                reused = False
+                if xref in seen_xrefs:
+                    # Same image object as an earlier page - no need to decode it again
+                    image_filename, sha256, size = seen_xrefs[xref]
+                    duplicate = True
+                elif xref in skip_xrefs:
+                    # Stored by an interrupted earlier run
+                    image_filename, sha256, size = seen_xrefs[xref] = store.known_image(pdf_hash, xref)
+                    duplicate, reused = False, True
+                else:
+                    base_image = pdf_document.extract_image(xref)
+                    image_bytes = base_image["image"]
+                    image_ext = base_image["ext"]
+
+                    # Generate filename
+                    image_filename = f"{prefix}image_page{page_num+1}_{img_index+1}.{image_ext}"
+                    image_filename, sha256, is_new = store.add(image_bytes, image_filename)
+                    size = len(image_bytes)
+                    duplicate = not is_new
+                    seen_xrefs[xref] = (image_filename, sha256, size)
+
+                store.record_occurrence(pdf_path, page_num + 1, img_index + 1, xref, image_filename, pdf_hash)
+                yield _image_info(store, image_filename, page_num + 1, img_index + 1, xref, sha256, size,
+                                  duplicate, reused)
+        store.finish_document(pdf_path, pdf_hash, signature)
+    finally:
+        if pdf_document is not None:
+            pdf_document.close()
+        if own_store:
+            store.close()
+
+
+# ---------- Parallel pipeline ----------
+def _extract_page_range(pdf_path, first, last, image_filter=None, skip_xrefs=frozenset()):
+    # Runs in a worker process, which opens its own document. Returns one
+    # (page, index, xref, ext, bytes) tuple per occurrence; bytes is None for
+    # an xref already returned earlier in this range or listed in skip_xrefs.
+    occurrences = []
+    seen_xrefs = set(skip_xrefs)
+    with fitz.open(pdf_path) as pdf_document:
+        for page_num in range(first - 1, last):
+            for img_index, img in _page_images(pdf_document, page_num, image_filter):
+                xref = img[0]
+                if xref in seen_xrefs:
+                    occurrences.append((page_num + 1, img_index + 1, xref, None, None))
+                    continue
+                seen_xrefs.add(xref)
+                base_image = pdf_document.extract_image(xref)
+                occurrences.append((page_num + 1, img_index + 1, xref, base_image["ext"], base_image["image"]))
+    return occurrences
+
+
+def extract_images_parallel(pdf_path, output_folder, workers=None, writers=4, chunk_pages=16, store=None,
+                            image_filter=None):
+    """Pipelined version of iter_extract_images() with the same info dicts.
+
+    Page ranges are extracted across a process pool and new files are written
+    by a pool of `writers` threads. Infos come out in page order, each one only
+    after its file is on disk. Only a few ranges per worker are in flight.
+    """
+    workers = workers or os.cpu_count() or 1
+    own_store = store is None
+    if own_store:
+        store = ImageStore(output_folder)
+
+    try:
+        pdf_hash = store.document_hash(pdf_path)
+        signature = None if image_filter is None else image_filter.signature()
+        done = store.completed_run(pdf_hash, signature)
+        if done is None:
+            yield from _extract_parallel(pdf_path, store, pdf_hash, signature, workers, writers, chunk_pages,
+                                         image_filter)
+        else:
+            yield from done
+    finally:
+        if own_store:
+            store.close()
+
+
+def _extract_parallel(pdf_path, store, pdf_hash, signature, workers, writers, chunk_pages, image_filter):
+    # The pipeline behind extract_images_parallel(), for a PDF without a reusable complete run
+    store.start_document(pdf_path, pdf_hash)
+    prefix = store.document_prefix(pdf_path, pdf_hash)
+    skip_xrefs = store.known_xrefs(pdf_hash)
+
+    # Listing a page's images only reads metadata. The first page each xref
+    # shows up on decides which range decodes it; every other range skips it.
+    first_seen = {}
+    with fitz.open(pdf_path) as pdf_document:
+        total_pages = len(pdf_document)
+        first_page, last_page = (1, total_pages) if image_filter is None else image_filter.page_range(total_pages)
+        for page_num in range(first_page - 1, last_page):
+            for _img_index, img in _page_images(pdf_document, page_num, image_filter):
+                first_seen.setdefault(img[0], page_num + 1)
+    ranges = [(first, min(first + chunk_pages - 1, last_page))
+              for first in range(first_page, last_page + 1, chunk_pages)]
+
+    def submit(first, last):
+        skip = skip_xrefs | {xref for xref, page in first_seen.items() if page < first}
+        return extract_pool.submit(_extract_page_range, pdf_path, first, last, image_filter, skip)
+
+    extract_pool = ProcessPoolExecutor(max_workers=workers)
+    write_pool = ThreadPoolExecutor(max_workers=writers)
+    try:
+        chunks = deque()
+        ranges = iter(ranges)
+        for first, last in ranges:
+            chunks.append(submit(first, last))
+            if len(chunks) >= workers * 2:
+                break
+
+        seen_xrefs = {}
+        written = deque()
+        while chunks:
+            occurrences = chunks.popleft().result()
+            for first, last in ranges:
+                chunks.append(submit(first, last))
+                break
+
+            for page, index, xref, image_ext, image_bytes in occurrences:
+                reused = False
+                if xref in seen_xrefs:
+                    image_filename, sha256, size = seen_xrefs[xref]
+                    duplicate, pending_write = True, None
+                elif xref in skip_xrefs:
+                    # Stored by an interrupted earlier run
+                    image_filename, sha256, size = seen_xrefs[xref] = store.known_image(pdf_hash, xref)
+                    duplicate, reused, pending_write = False, True, None
+                else:
+                    if image_bytes is None:
+                        raise RuntimeError(f"xref {xref} missing from its first page range")
+                    image_filename, sha256, is_new = store.reserve(
+                        image_bytes, f"{prefix}image_page{page}_{index}.{image_ext}"
+                    )
+                    size = len(image_bytes)
+                    duplicate = not is_new
+                    pending_write = write_pool.submit(store.write, image_bytes, image_filename) if is_new else None
+                    seen_xrefs[xref] = (image_filename, sha256, size)
+
+                store.record_occurrence(pdf_path, page, index, xref, image_filename, pdf_hash)
+                written.append((_image_info(store, image_filename, page, index, xref, sha256, size,
+                                            duplicate, reused), pending_write))
+
+                # Hand infos back in order as soon as their files are written
+                while written and (written[0][1] is None or written[0][1].done() or len(written) > writers * 8):
+                    info, pending_write = written.popleft()
+                    if pending_write is not None:
+                        pending_write.result()
+                    yield info
+
+        while written:
+            info, pending_write = written.popleft()
+            if pending_write is not None:
+                pending_write.result()
+            yield info
+        store.finish_document(pdf_path, pdf_hash, signature)
+    finally:
+        extract_pool.shutdown(wait=True, cancel_futures=True)
+        write_pool.shutdown(wait=True)
+
+
+# ---------- Rendering ----------
+RENDER_FORMATS = ("png", "jpeg", "webp")
+RENDER_COLORSPACES = ("RGB", "Gray")
+
+
+def render_folder_for(pdf_path):
+    """Subfolder name (relative to the output folder) for the page renders of one PDF"""
+    return os.path.splitext(os.path.basename(pdf_path))[0] + "_pages"
+
+
+def _render_page_range(pdf_path, first, last, output_folder, dpi, colorspace, fmt, quality):
+    # Runs in a worker process and writes its own files, so only small tuples
+    # travel back instead of full-page pixmaps. Returns one
+    # (page, filename, sha256, size) tuple per page.
+    folder = render_folder_for(pdf_path)
+    ext = "jpg" if fmt == "jpeg" else fmt
+    rendered = []
+    with fitz.open(pdf_path) as pdf_document:
+        for page_num in range(first - 1, last):
+            pix = pdf_document.load_page(page_num).get_pixmap(
+                dpi=dpi, colorspace=fitz.csGRAY if colorspace == "Gray" else fitz.csRGB, alpha=False
+            )
+            if fmt == "png":
+                data = pix.tobytes("png")
+            else:
+                img = Image.frombytes("L" if pix.n == 1 else "RGB", (pix.width, pix.height), pix.samples)
+                buf = io.BytesIO()
+                img.save(buf, fmt.upper(), quality=quality)
+                data = buf.getvalue()
+
+            filename = f"{folder}/page_{page_num + 1:04d}.{ext}"
+            path = os.path.join(output_folder, filename)
+            with open(path + ".part", "wb") as image_file:
+                image_file.write(data)
+            os.replace(path + ".part", path)
+            rendered.append((page_num + 1, filename, hashlib.sha256(data).hexdigest(), len(data)))
+    return rendered
+
+
+def render_pages(pdf_path, output_folder, dpi=150, colorspace="RGB", fmt="png", first_page=1, last_page=None,
+                 workers=None, chunk_pages=4, quality=85, report=None):
+    """Render whole pages to image files across a process pool.
+
+    Files go to a <pdf stem>_pages subfolder of output_folder and info dicts
+    shaped like iter_extract_images()' come out in page order. If `report` is
+    a dict it receives 'pages', 'seconds' and 'pages_per_sec'.
+    """
+    if fmt not in RENDER_FORMATS:
+        raise ValueError(f"Unknown render format: {fmt}")
+    if colorspace not in RENDER_COLORSPACES:
+        raise ValueError(f"Unknown render colorspace: {colorspace}")
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(os.path.join(output_folder, render_folder_for(pdf_path)), exist_ok=True)
+
+    with fitz.open(pdf_path) as pdf_document:
+        total_pages = len(pdf_document)
+    last_page = total_pages if last_page is None else min(last_page, total_pages)
+    ranges = iter([(first, min(first + chunk_pages - 1, last_page))
+                   for first in range(max(first_page, 1), last_page + 1, chunk_pages)])
+
+    start = time.perf_counter()
+    pages = 0
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        chunks = deque()
+        for first, last in ranges:
+            chunks.append(pool.submit(_render_page_range, pdf_path, first, last, output_folder,
+                                      dpi, colorspace, fmt, quality))
+            if len(chunks) >= workers * 2:
+                break
+
+        while chunks:
+            rendered = chunks.popleft().result()
+            for first, last in ranges:
+                chunks.append(pool.submit(_render_page_range, pdf_path, first, last, output_folder,
+                                          dpi, colorspace, fmt, quality))
+                break
+
+            for page, filename, sha256, size in rendered:
+                pages += 1
+                yield {
+                    'filename': filename,
+                    'path': os.path.join(output_folder, filename),
+                    'page': page,
+                    'index': 1,
+                    'xref': None,
+                    'sha256': sha256,
+                    'size': size,
+                    'duplicate': False,
+                    'reused': False
+                }
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if report is not None:
+            seconds = time.perf_counter() - start
+            report.update(pages=pages, seconds=round(seconds, 3),
+                          pages_per_sec=round(pages / seconds, 1) if seconds else None)
+
+
+# ---------- Combining ----------
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+JPX_SIGNATURES = (b"\x00\x00\x00\x0cjP  \r\n\x87\n", b"\xff\x4f\xff\x51")
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG colour types PDF can take as-is -> number of colour components
+PNG_COLORS = {0: 1, 2: 3, 3: 1}
+
+
+def _read_png(data):
+    """Return (header, palette, idat) for a PNG that can be embedded as-is, else None.
+
+    IDAT data is already a Flate stream with PNG predictors, which PDF
+    understands. Interlaced images and anything with transparency (colour
+    types 4/6, tRNS) still have to be decoded.
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+
+    pos = len(PNG_SIGNATURE)
+    header = None
+    palette = b""
+    idat = []
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        pos += length + 12
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif chunk_type == b"PLTE":
+            palette = body
+        elif chunk_type == b"tRNS":
+            return None
+        elif chunk_type == b"IDAT":
+            idat.append(body)
+        elif chunk_type == b"IEND":
+            break
+
+    if header is None or not idat:
+        return None
+    _width, _height, _bits, color_type, _compression, _filter, interlace = header
+    if interlace or color_type not in PNG_COLORS or (color_type == 3 and not palette):
+        return None
+    return header, palette, b"".join(idat)
+
+
+def _embed_png(pdf_document, header, palette, idat):
+    width, height, bits, color_type = header[:4]
+    if color_type == 0:
+        colorspace = "/DeviceGray"
+    elif color_type == 2:
+        colorspace = "/DeviceRGB"
+    else:
+        colorspace = f"[/Indexed /DeviceRGB {len(palette) // 3 - 1} <{palette.hex()}>]"
+
+    xref = pdf_document.get_new_xref()
+    pdf_document.update_object(xref, (
+        f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+        f"/ColorSpace {colorspace} /BitsPerComponent {bits} >>"
+    ))
+    # update_stream() resets Filter/DecodeParms, so set them afterwards
+    pdf_document.update_stream(xref, idat, compress=False)
+    pdf_document.xref_set_key(xref, "Filter", "/FlateDecode")
+    pdf_document.xref_set_key(xref, "DecodeParms", (
+        f"<< /Predictor 15 /Colors {PNG_COLORS[color_type]} "
+        f"/BitsPerComponent {bits} /Columns {width} >>"
+    ))
+    return xref
+
+
+def _deflate_image(pdf_document, xref):
+    # insert_image() keeps decoded pixels uncompressed and saveIncr() cannot
+    # deflate them later, so compress the image (and its alpha mask) now
+    xrefs = [xref]
+    kind, value = pdf_document.xref_get_key(xref, "SMask")
+    if kind == "xref":
+        xrefs.append(int(value.split()[0]))
+    for x in xrefs:
+        if pdf_document.xref_get_key(x, "Filter")[0] == "null":
+            pdf_document.update_stream(x, pdf_document.xref_stream(x), compress=True)
+
+
+def _image_size(data):
+    # Only the header is parsed here
+    with Image.open(io.BytesIO(data)) as img:
+        return img.size
+
+
+def _insert_image_page(pdf_document, data, resolution, report=None):
+    """Add a page showing the image bytes and return (xref, width, height)"""
+    width, height = _image_size(data)
+    page = pdf_document.new_page(width=width * 72.0 / resolution, height=height * 72.0 / resolution)
+
+    # Already-compressed streams go in untouched
+    png = _read_png(data)
+    if data.startswith(JPEG_SIGNATURE) or data.startswith(JPX_SIGNATURES):
+        mode, xref = "passthrough", page.insert_image(page.rect, stream=data)
+    elif png is not None:
+        xref = _embed_png(pdf_document, *png)
+        page.insert_image(page.rect, xref=xref)
+        mode = "passthrough"
+    else:
+        mode = "decoded"
+        try:
+            xref = page.insert_image(page.rect, stream=data)
+        except Exception:
+            # Formats PyMuPDF cannot read are converted through PIL
+            with Image.open(io.BytesIO(data)) as img:
+                buf = io.BytesIO()
+                img.convert("RGBA" if "A" in img.getbands() else "RGB").save(buf, "PNG")
+            xref = page.insert_image(page.rect, stream=buf.getvalue())
+        _deflate_image(pdf_document, xref)
+
+    if report is not None:
+        report[mode] = report.get(mode, 0) + 1
+    return xref, width, height
+
+
+def combine_images_to_pdf(image_paths, output_pdf, resolution=100.0, batch_size=8, on_page=None, report=None):
+    """Write one PDF page per image, streaming the images in one at a time.
+
+    Every `batch_size` images the document is saved incrementally and
+    reopened, so only that many image streams are held in memory however many
+    pages there are. An image file listed more than once is embedded once and
+    reused. Paths inside a ZipImageStore archive are read from the archive.
+    Missing files are skipped. Returns the number of pages written.
+
+    If `report` is a dict, it counts images embedded as-is ('passthrough')
+    and images that had to be decoded ('decoded').
+    """
+    partial = output_pdf + ".part"
+    pdf_document = fitz.open()
+    inserted = {}
+    archives = {}
+    pages = 0
+    saved = False
+    try:
+        for image_path in image_paths:
+            if image_path in inserted:
+                xref, width, height = inserted[image_path]
+                page = pdf_document.new_page(width=width * 72.0 / resolution, height=height * 72.0 / resolution)
+                page.insert_image(page.rect, xref=xref)
+            else:
+                try:
+                    data = read_image_bytes(image_path, archives)
+                except (OSError, KeyError, zipfile.BadZipFile):
+                    continue
+                inserted[image_path] = _insert_image_page(pdf_document, data, resolution, report)
+            pages += 1
+            if on_page:
+                on_page(pages, image_path)
+
+            if pages % batch_size == 0:
+                # Flush to disk and reopen: streams already written are read lazily from then on
+                if saved:
+                    pdf_document.saveIncr()
+                else:
+                    pdf_document.save(partial)
+                    saved = True
+                pdf_document.close()
+                pdf_document = fitz.open(partial)
+
+        if pages:
+            if saved:
+                pdf_document.saveIncr()
+            else:
+                pdf_document.save(partial)
+    finally:
+        pdf_document.close()
+        for archive in archives.values():
+            archive.close()
+
+    if pages:
+        os.replace(partial, output_pdf)
+    elif os.path.exists(partial):
+        os.remove(partial)
+    return pages
@@ -0,0 +1,187 @@
+"""Persistent on-disk cache for extracted PDF page text.
+
+Entries are keyed by the SHA-256 of the PDF's bytes plus the page number, so a
+renamed or copied file still hits the cache and an edited file never does.
+Callers fold the extraction backend into the hash with document_key(), since
+PyMuPDF and PyPDF2 do not produce the same text for the same page.
+The cache is a single SQLite file with a size limit; when it grows past the
+limit the least recently used pages are evicted first. It also remembers the
+hash of every file it has seen, so reopening an unchanged PDF does not read
+the whole file again.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".pdfextract_cache", "pages.sqlite3")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def document_key(file_hash, backend="auto"):
+    """Cache key for a document's pages as extracted with a given backend choice"""
+    return f"{file_hash}:{backend}"
+
+
+class PageTextCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                file_hash TEXT PRIMARY KEY,
+                page_count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                file_hash TEXT NOT NULL,
+                page_no INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (file_hash, page_no)
+            );
+            CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used);
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                file_hash TEXT NOT NULL
+            );
+        """)
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    # ---------- Lookups ----------
+    def get(self, file_hash, page_no):
+        """Return the cached text for a page, or None on a miss"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT text FROM pages WHERE file_hash = ? AND page_no = ?",
+                (file_hash, page_no)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._db.execute(
+                "UPDATE pages SET last_used = ? WHERE file_hash = ? AND page_no = ?",
+                (time.time(), file_hash, page_no)
+            )
+            return row[0]
+
+    def document_hash(self, path):
+        """Return a file's SHA-256, reusing the stored value while the file is unchanged"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._db.execute("SELECT size, mtime, file_hash FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None and tuple(row[:2]) == (stat.st_size, stat.st_mtime):
+            return row[2]
+
+        file_hash = file_digest(path)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime, file_hash) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime, file_hash)
+            )
+        return file_hash
+
+    def get_page_count(self, file_hash):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT page_count FROM documents WHERE file_hash = ?", (file_hash,)
+            ).fetchone()
+            return row[0] if row else None
+
+    # ---------- Updates ----------
+    def put(self, file_hash, page_no, text):
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            old = self._db.execute(
+                "SELECT size FROM pages WHERE file_hash = ? AND page_no = ?",
+                (file_hash, page_no)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (file_hash, page_no, text, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (file_hash, page_no, text, size, time.time())
+            )
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def put_page_count(self, file_hash, page_count):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (file_hash, page_count) VALUES (?, ?)",
+                (file_hash, page_count)
+            )
+
+    def _evict(self):
+        # Drop least recently used pages until we are back under 90% of the limit
+        target = self.max_bytes * 0.9
+        rows = self._db.execute("SELECT rowid, size FROM pages ORDER BY last_used")
+        doomed = []
+        for rowid, size in rows:
+            if self._total <= target:
+                break
+            doomed.append((rowid,))
+            self._total -= size
+        self._db.executemany("DELETE FROM pages WHERE rowid = ?", doomed)
+        self._db.execute(
+            "DELETE FROM documents WHERE file_hash NOT IN (SELECT DISTINCT file_hash FROM pages)"
+        )
+        self.evictions += len(doomed)
+
+    def flush(self):
+        with self._lock:
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM pages")
+            self._db.execute("DELETE FROM documents")
+            self._db.execute("DELETE FROM files")
+            self._db.commit()
+            self._total = 0
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    # ---------- Stats ----------
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def stats(self):
+        """Return a dict with hit/miss counters and current cache size"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'bytes': self._total,
+            'max_bytes': self.max_bytes,
+        }
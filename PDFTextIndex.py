@@ -0,0 +1,254 @@
+"""Full-text search index over extracted PDF pages.
+
+Page text from PDFextractEngine is stored in a SQLite FTS5 table, one row per
+page, so a query across thousands of PDFs returns page-level hits straight
+from the index. Documents are tracked by content hash: re-indexing skips files
+that have not changed and replaces the pages of files that have. A file whose
+size and modification time match the last run is not even read again.
+
+Command line usage:
+    python PDFTextIndex.py add contracts/ extra.pdf     # index PDFs (folders are walked)
+    python PDFTextIndex.py search "termination clause"  # page-level hits
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+from PDFextractEngine import extract_pages, iter_pdf_paths
+from PDFTextCache import file_digest
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".pdfextract_cache", "index.sqlite3")
+
+
+class PDFTextIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id INTEGER PRIMARY KEY,
+                file_hash TEXT NOT NULL UNIQUE,
+                page_count INTEGER NOT NULL,
+                indexed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                doc_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_doc_id ON files (doc_id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+                text,
+                doc_id UNINDEXED,
+                page_no UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """)
+        # Columns added after the first release; older index files gain them here
+        self._add_columns("files", size="INTEGER", mtime="REAL")
+        self._add_columns("documents", first_rowid="INTEGER", last_rowid="INTEGER")
+
+    def _add_columns(self, table, **columns):
+        existing = {row[1] for row in self._db.execute(f"PRAGMA table_info({table})")}
+        with self._db:
+            for name, kind in columns.items():
+                if name not in existing:
+                    self._db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+
+    # ---------- Indexing ----------
+    def add_file(self, filename, workers=1):
+        """Index one PDF. Returns True if it was (re)indexed, False if unchanged."""
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+
+        # Same size and mtime as last time: trust the stored hash instead of reading the file
+        row = self._db.execute("SELECT size, mtime FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None and tuple(row) == (stat.st_size, stat.st_mtime):
+            return False
+
+        file_hash = file_digest(path)
+        row = self._db.execute(
+            "SELECT doc_id FROM documents WHERE file_hash = ?", (file_hash,)
+        ).fetchone()
+        if row is not None:
+            # Same content already indexed - just make sure this path points at it
+            with self._db:
+                self._link_path(path, row[0], stat)
+            return False
+
+        with self._db:
+            cur = self._db.execute(
+                "INSERT INTO documents (file_hash, page_count, indexed_at) VALUES (?, 0, ?)",
+                (file_hash, time.time())
+            )
+            doc_id = cur.lastrowid
+
+            # The page rowids are remembered so the pages can later be deleted by
+            # rowid range; FTS5 cannot look rows up by an UNINDEXED column
+            page_count = 0
+            first_rowid, last_rowid = 1, 0  # an empty range for documents without text
+            for page_no, text in extract_pages(path, workers=workers):
+                if text.strip():
+                    rowid = self._db.execute(
+                        "INSERT INTO pages (text, doc_id, page_no) VALUES (?, ?, ?)",
+                        (text, doc_id, page_no)
+                    ).lastrowid
+                    if first_rowid > last_rowid:
+                        first_rowid = rowid
+                    last_rowid = rowid
+                page_count = page_no
+            self._db.execute(
+                "UPDATE documents SET page_count = ?, first_rowid = ?, last_rowid = ? WHERE doc_id = ?",
+                (page_count, first_rowid, last_rowid, doc_id)
+            )
+            self._link_path(path, doc_id, stat)
+        return True
+
+    def _link_path(self, path, doc_id, stat):
+        # A changed file drops the pages indexed under its old hash, unless a copy still uses them
+        old = self._db.execute("SELECT doc_id FROM files WHERE path = ?", (path,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO files (path, doc_id, size, mtime) VALUES (?, ?, ?, ?)",
+            (path, doc_id, stat.st_size, stat.st_mtime)
+        )
+        if old is not None and old[0] != doc_id:
+            self._drop_document(old[0])
+
+    def add_paths(self, paths, workers=1, on_file=None):
+        """Index every PDF under the given files/folders. Returns (indexed, skipped, failed).
+
+        A file that cannot be read is reported and skipped; on_file(filename,
+        changed, error) is called for every file, with error None on success.
+        """
+        indexed = skipped = failed = 0
+        for filename in iter_pdf_paths(paths):
+            try:
+                changed = self.add_file(filename, workers=workers)
+            except Exception as e:
+                failed += 1
+                if on_file:
+                    on_file(filename, False, e)
+                continue
+            if changed:
+                indexed += 1
+            else:
+                skipped += 1
+            if on_file:
+                on_file(filename, changed, None)
+        return indexed, skipped, failed
+
+    def remove_missing(self):
+        """Drop files that no longer exist. Returns how many were removed."""
+        missing = [(path, doc_id) for path, doc_id in self._db.execute("SELECT path, doc_id FROM files")
+                   if not os.path.exists(path)]
+        with self._db:
+            self._db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path, _doc_id in missing])
+            for doc_id in {doc_id for _path, doc_id in missing}:
+                self._drop_document(doc_id)
+        return len(missing)
+
+    def _drop_document(self, doc_id):
+        # Remove a document's pages once no file points at it any more
+        if self._db.execute("SELECT 1 FROM files WHERE doc_id = ? LIMIT 1", (doc_id,)).fetchone():
+            return
+        row = self._db.execute(
+            "SELECT first_rowid, last_rowid FROM documents WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        if row is not None and row[0] is not None:
+            self._db.execute(
+                "DELETE FROM pages WHERE rowid BETWEEN ? AND ? AND doc_id = ?", (row[0], row[1], doc_id)
+            )
+        else:
+            # Indexed before rowid ranges were recorded
+            self._db.execute("DELETE FROM pages WHERE doc_id = ?", (doc_id,))
+        self._db.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+
+    # ---------- Queries ----------
+    def search(self, query, limit=50):
+        """Return a list of (path, page_no, snippet) hits, best match first.
+
+        `query` uses FTS5 syntax: words, "exact phrases", AND/OR/NOT, prefix*.
+        """
+        rows = self._db.execute(
+            "SELECT f.path, p.page_no, snippet(pages, 0, '[', ']', '...', 12) "
+            "FROM pages p JOIN files f ON f.doc_id = p.doc_id "
+            "WHERE pages MATCH ? ORDER BY rank LIMIT ?",
+            (query, limit)
+        )
+        return rows.fetchall()
+
+    def stats(self):
+        documents, pages = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(page_count), 0) FROM documents"
+        ).fetchone()
+        files = self._db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        return {'files': files, 'documents': documents, 'pages': pages}
+
+    def close(self):
+        self._db.close()
+
+
+# ---------- CLI ----------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Index PDF text and search it page by page.")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="index database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="index PDF files or folders")
+    add.add_argument("paths", nargs="+")
+    add.add_argument("-j", "--jobs", type=int, default=1,
+                     help="worker processes per PDF (0 = one per CPU core)")
+    add.add_argument("--prune", action="store_true", help="also drop documents that no longer exist")
+
+    search = commands.add_parser("search", help="search the index")
+    search.add_argument("query")
+    search.add_argument("-n", "--limit", type=int, default=20)
+
+    commands.add_parser("stats", help="show index size")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    index = PDFTextIndex(args.index)
+
+    try:
+        if args.command == "add":
+            def report(filename, changed, error):
+                if error is not None:
+                    print(f"failed: {filename}: {error}", file=sys.stderr)
+                else:
+                    print(f"{'indexed' if changed else 'unchanged'}: {filename}", file=sys.stderr)
+
+            indexed, skipped, failed = index.add_paths(args.paths, workers=args.jobs or None, on_file=report)
+            print(f"Indexed {indexed} file(s), {skipped} unchanged, {failed} failed.")
+            if args.prune:
+                print(f"Removed {index.remove_missing()} missing file(s).")
+            if failed:
+                return 1
+
+        elif args.command == "search":
+            start = time.perf_counter()
+            try:
+                hits = index.search(args.query, args.limit)
+            except sqlite3.OperationalError as e:
+                print(f"Invalid query: {e}", file=sys.stderr)
+                return 2
+            elapsed = (time.perf_counter() - start) * 1000
+            for path, page_no, snippet in hits:
+                print(f"{path}:{page_no}: {' '.join(snippet.split())}")
+            print(f"{len(hits)} hit(s) in {elapsed:.1f} ms", file=sys.stderr)
+
+        elif args.command == "stats":
+            print(index.stats())
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""Thumbnail cache for the images listed by ImageExtractfrompdf.py.
+
+Thumbnails are keyed by the SHA-256 of the image bytes plus the thumbnail
+size, so the same image extracted from different PDFs (or into a different
+folder) is only ever scaled once. Recently used thumbnails are kept in memory;
+all of them are written as small PNG files to a folder on disk with a size
+limit, where the least recently used files are evicted first.
+
+ThumbnailLoader builds thumbnails on a background thread. Callers hand it the
+rows that are currently visible; anything requested earlier that has not been
+started yet is dropped, so fast scrolling never queues up stale work.
+"""
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from PDFImageEngine import read_image_bytes
+
+DEFAULT_THUMBNAIL_DIR = os.path.join(os.path.expanduser("~"), ".pdfextract_cache", "thumbnails")
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+
+class ThumbnailCache:
+    def __init__(self, folder=DEFAULT_THUMBNAIL_DIR, max_bytes=DEFAULT_MAX_BYTES, keep_in_memory=512):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.keep_in_memory = keep_in_memory
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(folder, exist_ok=True)
+        self._total = sum(entry.stat().st_size for entry in self._entries())
+
+    def _entries(self):
+        # Stored thumbnails, without the temp files of writes still in progress
+        return [entry for entry in os.scandir(self.folder) if entry.is_file() and not entry.name.endswith(".part")]
+
+    def _file_for(self, key):
+        image_hash, size = key
+        return os.path.join(self.folder, f"{image_hash}_{size}.png")
+
+    # ---------- Lookups ----------
+    def get(self, image_hash, size):
+        """Return a cached thumbnail as a PIL image, or None on a miss"""
+        key = (image_hash, size)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        path = self._file_for(key)
+        try:
+            with Image.open(path) as img:
+                thumb = img.copy()
+            os.utime(path)  # mtime doubles as the last-used time for eviction
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self._remember(key, thumb)
+        return thumb
+
+    def get_or_create(self, image_hash, size, image_path):
+        """Return the thumbnail for an image, scaling and caching it on a miss"""
+        thumb = self.get(image_hash, size)
+        if thumb is None:
+            with Image.open(io.BytesIO(read_image_bytes(image_path))) as img:
+                img.draft("RGB", (size, size))  # lets JPEG decode at reduced scale
+                thumb = img.convert("RGBA") if img.mode in ("RGBA", "LA", "P") else img.convert("RGB")
+            thumb.thumbnail((size, size))
+            self.put(image_hash, size, thumb)
+        return thumb
+
+    # ---------- Updates ----------
+    def put(self, image_hash, size, thumb):
+        key = (image_hash, size)
+        path = self._file_for(key)
+        buf = io.BytesIO()
+        thumb.save(buf, "PNG")
+        # A temp name of its own: the row loader and the preview may write the same thumbnail at once
+        fd, partial = tempfile.mkstemp(suffix=".part", dir=self.folder)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(buf.getvalue())
+            with self._lock:
+                try:
+                    replaced = os.path.getsize(path)
+                except OSError:
+                    replaced = 0
+                os.replace(partial, path)
+                self._remember(key, thumb)
+                self._total += len(buf.getvalue()) - replaced
+                if self._total > self.max_bytes:
+                    self._evict()
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+    def _remember(self, key, thumb):
+        self._memory[key] = thumb
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.keep_in_memory:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        # Drop least recently used files until the folder is back under 90% of the limit
+        entries = sorted(self._entries(), key=lambda e: e.stat().st_mtime)
+        target = self.max_bytes * 0.9
+        for entry in entries:
+            if self._total <= target:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._total -= size
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'bytes': self._total,
+                    'in_memory': len(self._memory)}
+
+
+class ThumbnailLoader:
+    """Background thread that fills a ThumbnailCache for the rows on screen.
+
+    on_ready(key, thumb) is called on the loader thread for every thumbnail
+    that becomes available; thumb is None if the image could not be read.
+    """
+
+    def __init__(self, cache, on_ready):
+        self.cache = cache
+        self.on_ready = on_ready
+        self._pending = OrderedDict()
+        self._wake = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, items, size):
+        """Replace the pending work with thumbnails for (key, image_hash, image_path) items"""
+        with self._wake:
+            self._pending = OrderedDict((key, (image_hash, size, path)) for key, image_hash, path in items)
+            self._wake.notify()
+
+    def stop(self):
+        with self._wake:
+            self._stopped = True
+            self._pending.clear()
+            self._wake.notify()
+
+    def _run(self):
+        while True:
+            with self._wake:
+                while not self._pending and not self._stopped:
+                    self._wake.wait()
+                if self._stopped:
+                    return
+                key, (image_hash, size, path) = self._pending.popitem(last=False)
+            try:
+                thumb = self.cache.get_or_create(image_hash, size, path)
+            except Exception:
+                thumb = None
+            self.on_ready(key, thumb)
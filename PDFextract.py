@@ -1,10 +1,27 @@
 import os
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-from PyPDF2 import PdfReader
+from PDFextractEngine import BackgroundExport, BackgroundExtraction, LazyPageSource, iter_pages_cached
+from PDFTextCache import PageTextCache
+
+# Re-opening an unchanged PDF is served from this on-disk cache
+page_cache = PageTextCache()
+
+# Only a small window of pages is rendered; the next few are prefetched
+PAGES_PER_VIEW = 3
+PREFETCH_PAGES = 6
+
+current_source = None
+current_page = 1
+extract_job = None
+save_job = None
+# Every job started, until it has finished - close_app() waits for them
+running_jobs = []
 
 # ---------- App Logic ----------
 def open_file():
+    global current_source
+
     filename = filedialog.askopenfilename(
         title="Open PDF file",
         initialdir=r'D:\codefirst.io\Tkinter Extract PDF Text',
@@ -13,49 +30,275 @@ def open_file():
     if not filename:
         return
 
+    try:
+        # Opening only reads the page tree - pages are extracted as they are shown
+        source = LazyPageSource(filename, cache=page_cache)
+    except Exception as e:
+        messagebox.showerror("Error", f"Could not read PDF.\n\n{e}")
+        return
+
+    close_source()
+    current_source = source
+
     # Show only the filename (not the whole path) in the label
     filename_label.configure(text=os.path.basename(filename))
+    page_total_label.configure(text=f"of {current_source.page_count}")
+    show_page(1)
+
+def close_source():
+    global current_source
+    cancel_extract()
+    if current_source is not None:
+        current_source.close()
+        current_source = None
+
+def show_page(page_no):
+    global current_page
+    if current_source is None:
+        return
+    cancel_extract()
+
+    last_start = max(current_source.page_count - PAGES_PER_VIEW + 1, 1)
+    current_page = min(max(page_no, 1), last_start)
+    last_page = min(current_page + PAGES_PER_VIEW - 1, current_source.page_count)
 
     # Clear previous output
     output_text.delete("1.0", "end")
 
     try:
-        # Read PDF text
-        with open(filename, "rb") as f:
-            reader = PdfReader(f)
+        for n in range(current_page, last_page + 1):
+            output_text.insert("end", current_source.get(n) + "\n")
+    except Exception as e:
+        messagebox.showerror("Error", f"Could not read PDF.\n\n{e}")
+        return
+
+    # Scroll to top after load
+    output_text.see("1.0")
+
+    # Commit what was just extracted, so it survives however the app is closed
+    current_source.flush()
+
+    page_entry.delete(0, "end")
+    page_entry.insert(0, str(current_page))
+    range_from_entry.delete(0, "end")
+    range_from_entry.insert(0, str(current_page))
+    range_to_entry.delete(0, "end")
+    range_to_entry.insert(0, str(last_page))
+
+    # Warm up the pages the user is most likely to look at next
+    current_source.prefetch(range(last_page + 1, last_page + 1 + PREFETCH_PAGES))
+
+def next_page(event=None):
+    show_page(current_page + PAGES_PER_VIEW)
+
+def prev_page(event=None):
+    show_page(current_page - PAGES_PER_VIEW)
+
+def go_to_page(event=None):
+    try:
+        show_page(int(page_entry.get()))
+    except ValueError:
+        page_entry.delete(0, "end")
+        page_entry.insert(0, str(current_page))
+
+def selected_range():
+    """Return the (first, last) pages typed in the range boxes, clamped to the document"""
+    total = current_source.page_count
+    try:
+        first = int(range_from_entry.get() or 1)
+        last = int(range_to_entry.get() or total)
+    except ValueError:
+        raise ValueError("Page range must be whole numbers.")
+    first, last = max(first, 1), min(last, total)
+    if first > last:
+        raise ValueError(f"Empty page range: {first}-{last}.")
+    return first, last
+
+def start_extract():
+    global extract_job
+    if save_job is not None:
+        return
+    if current_source is None:
+        messagebox.showinfo("No PDF", "Open a PDF first.")
+        return
+    try:
+        first, last = selected_range()
+    except ValueError as e:
+        messagebox.showerror("Page range", str(e))
+        return
+
+    cancel_extract()
+    output_text.delete("1.0", "end")
+    progress_bar.set(0)
+    progress_label.configure(text=f"0/{last - first + 1} pages")
+    extract_button.configure(state="disabled")
+    cancel_button.configure(state="normal")
+
+    # Pages are extracted on a worker thread and posted back to the UI in batches
+    pages = iter_pages_cached(current_source.filename, page_cache, first, last)
+    job = BackgroundExtraction(
+        pages, last - first + 1,
+        on_batch=lambda batch: app.after(0, lambda: add_batch(job, batch)),
+        on_done=lambda error: app.after(0, lambda: finish_extract(job, error))
+    )
+    extract_job = job
+    start_job(job)
 
-            # New PyPDF2 API: iterate pages via reader.pages
-            for page in reader.pages:
-                current_text = page.extract_text() or ""
-                output_text.insert("end", current_text + "\n")
+def add_batch(job, batch):
+    # Ignore batches from a job that was cancelled or replaced meanwhile
+    if job is not extract_job or job.cancelled:
+        return
+    output_text.insert("end", "".join(text + "\n" for _page_no, text in batch))
+    progress_bar.set(job.pages_done / job.total)
+    progress_label.configure(
+        text=f"{job.pages_done}/{job.total} pages - {job.pages_per_second:.1f} pages/s"
+    )
 
-        # Scroll to top after load
+def finish_extract(job, error):
+    global extract_job
+    if job is not extract_job:
+        return
+    extract_job = None
+    extract_button.configure(state="normal")
+    cancel_button.configure(state="disabled")
+
+    if error is not None:
+        progress_label.configure(text="Extraction failed")
+        messagebox.showerror("Error", f"Could not read PDF.\n\n{error}")
+    elif job.cancelled:
+        progress_label.configure(text=f"Cancelled after {job.pages_done}/{job.total} pages")
+    else:
+        progress_bar.set(1)
+        progress_label.configure(
+            text=f"{job.pages_done} pages - {job.pages_per_second:.1f} pages/s"
+        )
         output_text.see("1.0")
 
-    except Exception as e:
-        messagebox.showerror("Error", f"Could not read PDF.\n\n{e}")
+def cancel_extract():
+    global extract_job
+    if extract_job is None:
+        return
+    extract_job.cancel()
+    progress_label.configure(
+        text=f"Cancelled after {extract_job.pages_done}/{extract_job.total} pages"
+    )
+    extract_job = None
+    extract_button.configure(state="normal")
+    cancel_button.configure(state="disabled")
 
 def clear_text():
+    close_source()
     output_text.delete("1.0", "end")
+    filename_label.configure(text="No file selected")
+    page_entry.delete(0, "end")
+    page_total_label.configure(text="of 0")
+    progress_bar.set(0)
+    progress_label.configure(text="")
+
+def cancel_job():
+    # The Cancel button stops whichever job is running
+    if save_job is not None:
+        cancel_save()
+    else:
+        cancel_extract()
+
+def start_job(job):
+    running_jobs[:] = [running for running in running_jobs if not running.join(0)]
+    running_jobs.append(job)
+    job.start()
+
+def close_app():
+    # Cancelled workers still finish their current page, flush the page cache
+    # and remove a partial save file; wait for that before the cache and the
+    # window go away. update() lets a worker that is posting to the window
+    # meanwhile get through.
+    cancel_save()
+    close_source()
+    for job in running_jobs:
+        job.cancel()
+        while not job.join(0.05):
+            app.update()
+    page_cache.close()
+    app.destroy()
 
 def save_text():
-    text = output_text.get("1.0", "end").strip()
-    if not text:
-        messagebox.showinfo("Nothing to save", "The text box is empty.")
+    global save_job
+    if current_source is None:
+        messagebox.showinfo("Nothing to save", "No PDF is open.")
+        return
+    if save_job is not None:
         return
 
     save_path = filedialog.asksaveasfilename(
         title="Save extracted text",
         defaultextension=".txt",
-        filetypes=[("Text file", "*.txt"), ("All files", "*.*")]
+        filetypes=[
+            ("Text file", "*.txt"),
+            ("Text file, gzipped", "*.txt.gz"),
+            ("JSON Lines (one record per page)", "*.jsonl"),
+            ("JSON Lines, gzipped", "*.jsonl.gz"),
+            ("All files", "*.*")
+        ]
+    )
+    if not save_path:
+        return
+
+    cancel_extract()
+    total = current_source.page_count
+    progress_bar.set(0)
+    progress_label.configure(text=f"Saving 0/{total} pages")
+    save_button.configure(state="disabled")
+    extract_button.configure(state="disabled")
+    cancel_button.configure(state="normal")
+
+    # Stream straight from the cache/extractor on a worker thread - the format follows the file name
+    pages = iter_pages_cached(current_source.filename, page_cache)
+    job = BackgroundExport(
+        pages, total, save_path,
+        on_progress=lambda: app.after(0, lambda: save_progress(job)),
+        on_done=lambda error: app.after(0, lambda: finish_save(job, error))
+    )
+    save_job = job
+    start_job(job)
+
+def save_progress(job):
+    if job is not save_job:
+        return
+    progress_bar.set(job.pages_done / job.total)
+    progress_label.configure(
+        text=f"Saving {job.pages_done}/{job.total} pages - {job.pages_per_second:.1f} pages/s"
     )
-    if save_path:
-        try:
-            with open(save_path, "w", encoding="utf-8") as f:
-                f.write(text)
-            messagebox.showinfo("Saved", f"Text saved to:\n{save_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not save file.\n\n{e}")
+
+def finish_save(job, error):
+    global save_job
+    if job is not save_job:
+        return
+    save_job = None
+    save_button.configure(state="normal")
+    extract_button.configure(state="normal")
+    cancel_button.configure(state="disabled")
+
+    if error is not None:
+        progress_label.configure(text="Save failed")
+        messagebox.showerror("Error", f"Could not save file.\n\n{error}")
+    elif job.cancelled:
+        progress_label.configure(text="Save cancelled - partial file removed")
+    else:
+        progress_bar.set(1)
+        progress_label.configure(text=f"Saved {job.pages_done} pages")
+        messagebox.showinfo("Saved", f"Text saved to:\n{job.save_path}")
+
+def cancel_save():
+    global save_job
+    if save_job is None:
+        return
+    # The worker removes the partial file once it notices
+    save_job.cancel()
+    progress_label.configure(text="Save cancelled - partial file removed")
+    save_job = None
+    save_button.configure(state="normal")
+    extract_button.configure(state="normal")
+    cancel_button.configure(state="disabled")
 
 # ---------- UI Setup (CustomTkinter) ----------
 ctk.set_appearance_mode("System")      # "Light", "Dark", or "System"
@@ -64,6 +307,7 @@ ctk.set_default_color_theme("blue")    # "blue", "green", "dark-blue", or a cust
 app = ctk.CTk()
 app.title("PDF Text Extractor (CustomTkinter)")
 app.geometry("900x600")
+app.protocol("WM_DELETE_WINDOW", close_app)
 
 # Make the main window responsive
 app.grid_rowconfigure(1, weight=1)
@@ -87,10 +331,51 @@ filename_label.grid(row=0, column=2, sticky="ew", padx=(6, 10), pady=10)
 output_text = ctk.CTkTextbox(app, wrap="word")
 output_text.grid(row=1, column=0, sticky="nsew", padx=10, pady=(6, 10))
 
-# Optional: Clear button at the bottom
+# Bottom bar: page navigation + Clear button
 bottom_frame = ctk.CTkFrame(app, fg_color="transparent")
 bottom_frame.grid(row=2, column=0, sticky="ew", padx=10, pady=(0, 10))
+
+prev_button = ctk.CTkButton(bottom_frame, text="< Prev", command=prev_page, width=80)
+prev_button.pack(side="left")
+
+page_entry = ctk.CTkEntry(bottom_frame, width=70, justify="center")
+page_entry.pack(side="left", padx=6)
+page_entry.bind("<Return>", go_to_page)
+
+page_total_label = ctk.CTkLabel(bottom_frame, text="of 0")
+page_total_label.pack(side="left", padx=(0, 6))
+
+next_button = ctk.CTkButton(bottom_frame, text="Next >", command=next_page, width=80)
+next_button.pack(side="left")
+
 clear_button = ctk.CTkButton(bottom_frame, text="Clear", command=clear_text, width=100)
-clear_button.pack(anchor="e")
+clear_button.pack(side="right")
+
+# Range bar: extract a page range in the background with live progress
+range_frame = ctk.CTkFrame(app, fg_color="transparent")
+range_frame.grid(row=3, column=0, sticky="ew", padx=10, pady=(0, 10))
+
+ctk.CTkLabel(range_frame, text="Pages").pack(side="left", padx=(0, 6))
+range_from_entry = ctk.CTkEntry(range_frame, width=70, justify="center")
+range_from_entry.pack(side="left")
+ctk.CTkLabel(range_frame, text="to").pack(side="left", padx=6)
+range_to_entry = ctk.CTkEntry(range_frame, width=70, justify="center")
+range_to_entry.pack(side="left")
+
+extract_button = ctk.CTkButton(range_frame, text="Extract Range", command=start_extract, width=110)
+extract_button.pack(side="left", padx=(10, 6))
+
+cancel_button = ctk.CTkButton(range_frame, text="Cancel", command=cancel_job, width=80, state="disabled")
+cancel_button.pack(side="left")
+
+progress_bar = ctk.CTkProgressBar(range_frame)
+progress_bar.pack(side="left", fill="x", expand=True, padx=10)
+progress_bar.set(0)
+
+progress_label = ctk.CTkLabel(range_frame, text="", width=220, anchor="w")
+progress_label.pack(side="left")
+
+app.bind("<Next>", next_page)
+app.bind("<Prior>", prev_page)
 
 app.mainloop()
@@ -0,0 +1,557 @@
+"""Headless text extraction engine for PDFextract.py.
+
+Pages come out of a generator as (page_no, text) pairs, so a large document
+can be streamed to stdout, a file or the GUI textbox without ever holding the
+whole text in memory.
+
+Command line usage:
+    python PDFextractEngine.py input.pdf                 # print to stdout
+    python PDFextractEngine.py input.pdf -o output.txt   # write to a file
+    python PDFextractEngine.py input.pdf -o pages.jsonl.gz  # one JSON record per page, gzipped
+    python PDFextractEngine.py input.pdf --first 10 --last 20
+    python PDFextractEngine.py input.pdf --jobs 16         # use a process pool
+    python PDFextractEngine.py input.pdf --cache           # reuse the on-disk page cache
+    python PDFextractEngine.py input.pdf --backend pypdf2 --report
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from PDFBackends import BACKEND_CHOICES, PDFDocument, format_report, merge_report
+from PDFTextCache import PageTextCache, document_key
+
+
+# ---------- Extraction ----------
+def page_count(filename, backend="auto"):
+    """Return the number of pages in the PDF"""
+    with PDFDocument(filename, backend) as doc:
+        return doc.page_count
+
+
+def iter_pages(filename, first=1, last=None, backend="auto", report=None):
+    """Yield (page_no, text) for each page, page numbers start at 1.
+
+    `backend` is "auto" or a name from PDFBackends.BACKENDS; other backends are
+    used as fallbacks. If `report` is a dict, per-backend counters are added to it.
+    """
+    doc = PDFDocument(filename, backend)
+    try:
+        last = doc.page_count if last is None else min(last, doc.page_count)
+        for page_no in range(max(first, 1), last + 1):
+            yield page_no, doc.page_text(page_no)
+    finally:
+        doc.close()
+        merge_report(report, doc.report)
+
+
+def iter_pdf_paths(paths):
+    """Yield every .pdf file among the given paths, walking folders recursively"""
+    for item in paths:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for file in sorted(files):
+                    if file.lower().endswith(".pdf"):
+                        yield os.path.join(root, file)
+        elif os.path.isfile(item):
+            yield item
+
+
+# ---------- Parallel extraction ----------
+def _extract_chunk(filename, first, last, backend):
+    # Runs in a worker process, which opens its own reader
+    report = {}
+    pages = list(iter_pages(filename, first, last, backend, report))
+    return pages, report
+
+
+def split_range(first, last, parts):
+    """Split the inclusive page range first..last into at most `parts` (first, last) chunks"""
+    total = last - first + 1
+    if total <= 0:
+        return []
+    size, extra = divmod(total, parts)
+    chunks = []
+    start = first
+    for i in range(min(parts, total)):
+        end = start + size + (1 if i < extra else 0) - 1
+        chunks.append((start, end))
+        start = end + 1
+    return chunks
+
+
+def iter_pages_parallel(filename, first=1, last=None, workers=None, chunk_pages=25,
+                        backend="auto", report=None):
+    """Like iter_pages(), but pages are extracted across a process pool.
+
+    The page range is cut into chunks of about `chunk_pages` pages. Results are
+    yielded in page order, and only a couple of chunks per worker are in flight
+    at a time so memory stays bounded for very long documents.
+    """
+    workers = workers or os.cpu_count() or 1
+    total = page_count(filename, backend)
+    first = max(first, 1)
+    last = total if last is None else min(last, total)
+
+    parts = max(1, -(-(last - first + 1) // chunk_pages))
+    chunks = split_range(first, last, parts)
+    if workers <= 1 or len(chunks) <= 1:
+        yield from iter_pages(filename, first, last, backend, report)
+        return
+
+    # Not a with block: closing the generator early (cancel, a closed pipe) must
+    # drop the queued chunks instead of waiting for all of them
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = deque()
+        chunks = iter(chunks)
+        for chunk in chunks:
+            pending.append(pool.submit(_extract_chunk, filename, *chunk, backend))
+            if len(pending) >= workers * 2:
+                break
+
+        while pending:
+            pages, chunk_report = pending.popleft().result()
+            merge_report(report, chunk_report)
+            yield from pages
+            for chunk in chunks:
+                pending.append(pool.submit(_extract_chunk, filename, *chunk, backend))
+                break
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def extract_pages(filename, first=1, last=None, workers=1, backend="auto", report=None):
+    """Pick the serial or the process-pool extractor depending on `workers`"""
+    if workers == 1:
+        return iter_pages(filename, first, last, backend, report)
+    return iter_pages_parallel(filename, first, last, workers=workers, backend=backend, report=report)
+
+
+# ---------- Cached extraction ----------
+def iter_pages_cached(filename, cache, first=1, last=None, workers=1, backend="auto", report=None):
+    """Like extract_pages(), but served from a PageTextCache where possible.
+
+    Pages are looked up by file hash, backend and page number. Each run of
+    consecutive misses is extracted normally and written back to the cache;
+    cached pages around it are served as they are.
+    """
+    file_hash = document_key(cache.document_hash(filename), backend)
+    total = cache.get_page_count(file_hash)
+    if total is None:
+        total = page_count(filename, backend)
+        cache.put_page_count(file_hash, total)
+
+    first = max(first, 1)
+    last = total if last is None else min(last, total)
+
+    try:
+        page_no = first
+        while page_no <= last:
+            text = cache.get(file_hash, page_no)
+            if text is not None:
+                yield page_no, text
+                page_no += 1
+                continue
+
+            # Find where this run of misses ends; the hit after it comes out afterwards
+            end, hit = page_no, None
+            while end < last:
+                hit = cache.get(file_hash, end + 1)
+                if hit is not None:
+                    break
+                end += 1
+            for miss_no, miss_text in extract_pages(filename, page_no, end, workers, backend, report):
+                cache.put(file_hash, miss_no, miss_text)
+                yield miss_no, miss_text
+            if hit is not None:
+                yield end + 1, hit
+                end += 1
+            page_no = end + 1
+    finally:
+        cache.flush()
+
+
+# ---------- Random access ----------
+class LazyPageSource:
+    """Random access to page text for viewers.
+
+    Opening only reads the page tree; a page is extracted the first time it is
+    asked for and kept in a small LRU, so memory does not grow with page count.
+    prefetch() extracts upcoming pages on a background thread. Pages written
+    to the cache are committed by flush(), after every prefetch batch, and by
+    close().
+
+    The file is hashed for the cache key on a background thread, so opening a
+    large PDF never waits for it; pages read before the hash is known are
+    written to the cache once it is.
+    """
+
+    def __init__(self, filename, cache=None, keep_pages=64, backend="auto"):
+        self.filename = filename
+        self.keep_pages = keep_pages
+        self._doc = PDFDocument(filename, backend)
+        self.page_count = self._doc.page_count
+
+        self._cache = cache
+        self._file_hash = None
+        self._hashed = threading.Event()
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()       # the LRU and the cache
+        self._doc_lock = threading.Lock()   # the open document, which is not thread-safe
+
+        self._wanted = []
+        self._wanted_cond = threading.Condition()
+        self._worker = None
+        self._closed = False
+
+        if cache is None:
+            self._hashed.set()
+        else:
+            threading.Thread(target=self._hash_file, args=(backend,), daemon=True).start()
+
+    def _hash_file(self, backend):
+        try:
+            file_hash = document_key(self._cache.document_hash(self.filename), backend)
+        except Exception:
+            # The file or the cache went away meanwhile; pages are just not cached
+            self._hashed.set()
+            return
+        with self._lock:
+            if not self._closed:
+                self._file_hash = file_hash
+                for page_no, text in self._pages.items():
+                    self._cache.put(file_hash, page_no, text)
+        self._hashed.set()
+
+    def get(self, page_no):
+        """Return the text of a page (1-based), extracting it if needed"""
+        if not 1 <= page_no <= self.page_count:
+            raise IndexError(f"page {page_no} out of range 1..{self.page_count}")
+
+        with self._lock:
+            if self._closed:
+                raise ValueError("page source is closed")
+            if page_no in self._pages:
+                self._pages.move_to_end(page_no)
+                return self._pages[page_no]
+            if self._file_hash is not None:
+                text = self._cache.get(self._file_hash, page_no)
+                if text is not None:
+                    self._remember(page_no, text)
+                    return text
+
+        # Extract without holding the LRU lock, so pages already in memory or
+        # in the cache stay readable meanwhile
+        with self._doc_lock:
+            if self._closed:
+                raise ValueError("page source is closed")
+            text = self._doc.page_text(page_no)
+
+        with self._lock:
+            if not self._closed:
+                if self._file_hash is not None:
+                    self._cache.put(self._file_hash, page_no, text)
+                self._remember(page_no, text)
+        return text
+
+    def _remember(self, page_no, text):
+        self._pages[page_no] = text
+        while len(self._pages) > self.keep_pages:
+            self._pages.popitem(last=False)
+
+    def prefetch(self, page_nos):
+        """Extract these pages in the background, replacing any earlier request"""
+        with self._wanted_cond:
+            self._wanted = [p for p in page_nos if 1 <= p <= self.page_count]
+            self._wanted_cond.notify()
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._prefetch_loop, daemon=True)
+            self._worker.start()
+
+    def _prefetch_loop(self):
+        while True:
+            with self._wanted_cond:
+                while not self._wanted and not self._closed:
+                    self._wanted_cond.wait()
+                if self._closed:
+                    return
+                page_no = self._wanted.pop(0)
+                batch_done = not self._wanted
+            # Prefetched pages are meant for the cache, so wait for its key
+            self._hashed.wait()
+            try:
+                self.get(page_no)
+            except ValueError:
+                return
+            if batch_done:
+                self.flush()
+
+    def flush(self):
+        """Commit the pages extracted so far to the cache"""
+        with self._lock:
+            if self._cache is not None and not self._closed:
+                self._cache.flush()
+
+    def close(self):
+        with self._wanted_cond:
+            self._closed = True
+            self._wanted_cond.notify()
+        with self._lock:
+            if self._cache is not None:
+                self._cache.flush()
+            self._pages.clear()
+        with self._doc_lock:
+            self._doc.close()
+
+    @property
+    def report(self):
+        """Per-backend counters: which backend served the pages and how long it took"""
+        return self._doc.report
+
+
+# ---------- Background extraction ----------
+class BackgroundExtraction:
+    """Drains a page iterator on a worker thread and hands pages back in batches.
+
+    on_batch(pages) is called with a list of (page_no, text) every `batch_pages`
+    pages or `batch_seconds`, whichever comes first; on_done(error) is called
+    once at the end, with error None on success or after cancel(). Both run on
+    the worker thread, so GUI callers should forward them with after().
+    """
+
+    def __init__(self, pages, total, on_batch, on_done, batch_pages=10, batch_seconds=0.25):
+        self.pages = pages
+        self.total = total
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.batch_pages = batch_pages
+        self.batch_seconds = batch_seconds
+        self.pages_done = 0
+        self.started_at = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def join(self, timeout=None):
+        """Wait for the worker thread. Returns True once it has finished."""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def pages_per_second(self):
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0
+        return self.pages_done / elapsed if elapsed > 0 else 0.0
+
+    def _run(self):
+        error = None
+        batch = []
+        last_flush = time.perf_counter()
+        try:
+            for page in self.pages:
+                if self._cancel.is_set():
+                    break
+                batch.append(page)
+                self.pages_done += 1
+                now = time.perf_counter()
+                if len(batch) >= self.batch_pages or now - last_flush >= self.batch_seconds:
+                    self.on_batch(batch)
+                    batch = []
+                    last_flush = now
+            if batch and not self._cancel.is_set():
+                self.on_batch(batch)
+        except Exception as e:
+            error = e
+        finally:
+            # Runs the generator's cleanup (closes the file, flushes the cache)
+            close = getattr(self.pages, "close", None)
+            if close:
+                close()
+        self.on_done(error)
+
+
+class BackgroundExport(BackgroundExtraction):
+    """Streams a page iterator into a file on a worker thread - see export_pages().
+
+    The file is written as save_path + ".part" and renamed into place once
+    complete; after cancel() or an error the partial file is removed.
+    on_progress() is called every `batch_pages` pages or `batch_seconds`
+    (read pages_done for the count) and on_done(error) once at the end, both
+    on the worker thread.
+    """
+
+    def __init__(self, pages, total, save_path, on_progress, on_done, batch_pages=50, batch_seconds=0.25):
+        super().__init__(pages, total, None, on_done, batch_pages, batch_seconds)
+        self.save_path = save_path
+        self.on_progress = on_progress
+
+    def _counted(self):
+        # Stopping early just ends the stream; _run() then throws the file away
+        last_flush = time.perf_counter()
+        for page in self.pages:
+            if self._cancel.is_set():
+                return
+            yield page
+            self.pages_done += 1
+            now = time.perf_counter()
+            if self.pages_done % self.batch_pages == 0 or now - last_flush >= self.batch_seconds:
+                self.on_progress()
+                last_flush = now
+
+    def _run(self):
+        error = None
+        partial = self.save_path + ".part"
+        fmt, compress = export_format(self.save_path)
+        try:
+            export_pages(self._counted(), partial, fmt, compress)
+            if not self._cancel.is_set():
+                os.replace(partial, self.save_path)
+        except Exception as e:
+            error = e
+        finally:
+            close = getattr(self.pages, "close", None)
+            if close:
+                close()
+            if os.path.exists(partial):
+                os.remove(partial)
+        self.on_done(error)
+
+
+# ---------- Consumers ----------
+def stream_text(pages, write):
+    """Pass each page's text to write(), one page at a time. Returns pages written."""
+    count = 0
+    for _page_no, text in pages:
+        write(text + "\n")
+        count += 1
+    return count
+
+
+def stream_jsonl(pages, write):
+    """Write one {"page": n, "text": ...} JSON record per line. Returns pages written."""
+    count = 0
+    for page_no, text in pages:
+        write(json.dumps({'page': page_no, 'text': text}, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+EXPORT_FORMATS = ("txt", "jsonl")
+WRITE_BUFFER = 1024 * 1024
+
+
+def export_format(save_path):
+    """Guess (format, gzip) from a file name like pages.jsonl.gz"""
+    name = save_path.lower()
+    compress = name.endswith(".gz")
+    if compress:
+        name = name[:-3]
+    return ("jsonl" if name.endswith(".jsonl") else "txt"), compress
+
+
+def export_pages(pages, save_path, fmt=None, compress=None):
+    """Stream pages into a file as plain text or JSONL, optionally gzip-compressed.
+
+    Pages are written as they arrive through a 1 MB buffer, so memory stays
+    flat however large the document is. Returns the number of pages written.
+    """
+    guessed_fmt, guessed_compress = export_format(save_path)
+    fmt = fmt or guessed_fmt
+    compress = guessed_compress if compress is None else compress
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    if compress:
+        out = gzip.open(save_path, "wt", encoding="utf-8", compresslevel=6)
+    else:
+        out = open(save_path, "w", encoding="utf-8", buffering=WRITE_BUFFER)
+    with out:
+        if fmt == "jsonl":
+            return stream_jsonl(pages, out.write)
+        return stream_text(pages, out.write)
+
+
+def extract_to_file(filename, save_path, first=1, last=None, workers=1, cache=None,
+                    backend="auto", report=None, fmt=None, compress=None):
+    """Stream the PDF's text straight into a file - see export_pages() for formats"""
+    if cache is not None:
+        pages = iter_pages_cached(filename, cache, first, last, workers, backend, report)
+    else:
+        pages = extract_pages(filename, first, last, workers, backend, report)
+    return export_pages(pages, save_path, fmt, compress)
+
+
+# ---------- CLI ----------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Extract text from a PDF, one page at a time.")
+    parser.add_argument("pdf", help="PDF file to read")
+    parser.add_argument("-o", "--output", help="write text to this file instead of stdout")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=None,
+                        help="output format (default: from the file name, else txt)")
+    parser.add_argument("--gzip", action="store_true", default=None,
+                        help="gzip the output file (default: when the name ends in .gz)")
+    parser.add_argument("--first", type=int, default=1, help="first page to extract (1-based)")
+    parser.add_argument("--last", type=int, default=None, help="last page to extract (inclusive)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes to use (0 = one per CPU core)")
+    parser.add_argument("--cache", nargs="?", const="", default=None, metavar="PATH",
+                        help="use the persistent page cache (optionally at PATH)")
+    parser.add_argument("--cache-stats", action="store_true",
+                        help="print cache hit/miss counters to stderr when done")
+    parser.add_argument("--backend", choices=BACKEND_CHOICES, default="auto",
+                        help="preferred PDF library; the others are used as fallbacks")
+    parser.add_argument("--report", action="store_true",
+                        help="print which backend served the pages and how long it took")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    workers = args.jobs or None
+    cache = None
+    if args.cache is not None:
+        cache = PageTextCache(args.cache) if args.cache else PageTextCache()
+
+    report = {}
+    try:
+        if args.output:
+            extract_to_file(args.pdf, args.output, args.first, args.last, workers, cache,
+                            args.backend, report, args.format, args.gzip)
+        else:
+            if cache is not None:
+                pages = iter_pages_cached(args.pdf, cache, args.first, args.last, workers,
+                                          args.backend, report)
+            else:
+                pages = extract_pages(args.pdf, args.first, args.last, workers, args.backend, report)
+            write = stream_jsonl if args.format == "jsonl" else stream_text
+            write(pages, sys.stdout.write)
+    finally:
+        if args.report and report:
+            print(format_report(report), file=sys.stderr)
+        if cache is not None:
+            if args.cache_stats:
+                print(cache.stats(), file=sys.stderr)
+            cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
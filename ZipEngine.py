@@ -0,0 +1,681 @@
+"""Headless zip engine for ZipUnzip2.py.
+
+ParallelZipWriter spreads deflate work over a pool of threads (zlib releases
+the GIL while it compresses). Every file is cut into chunks that are
+compressed independently, each primed with the last 32 KB of the chunk before
+it so matches can still reach back across the boundary, and flushed on a byte
+boundary so the pieces concatenate into one ordinary deflate stream. A single
+writer appends the compressed pieces to the archive in order, so the result
+is a standard zip that any tool can read.
+
+CompressionPolicy decides per file whether deflating is worth it at all.
+Media, archives and other already-compressed files are stored as they are,
+recognised by extension, by magic bytes, or by a quick trial compression of
+their first block, so zipping media-heavy folders is bound by the disk
+rather than the CPU.
+
+ZipJob carries progress (bytes, files, MB/s, ETA) from a running job to the
+UI and carries cancellation back. A cancelled or failed job removes its
+partial output: archives are written to a .part file that only replaces the
+target once complete, and extraction deletes the files it had created.
+
+extract_zip() inflates members on a pool of threads, each with its own
+ZipFile handle, and can leave existing files alone - either always, or when
+their size and CRC already match the member - so re-extracting over a tree
+only writes what changed.
+
+create_zip(..., update=True) refreshes an existing archive instead of
+rebuilding it. Each file is compared with its entry in the old archive's
+central directory - size and timestamp, then CRC when only the timestamp
+moved - and unchanged members are copied across still compressed, so only
+new and modified files go through the compressor. The returned counters list
+what was added, changed and removed.
+
+Command line usage:
+    python ZipEngine.py out.zip folder/ file.txt --jobs 8
+    python ZipEngine.py out.zip folder/ --update
+"""
+import argparse
+import os
+import struct
+import sys
+import threading
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+CHUNK_SIZE = 1024 * 1024
+WINDOW_SIZE = 32 * 1024
+TRIAL_SIZE = 64 * 1024
+EXTRACT_BATCH_FILES = 64
+EXTRACT_BATCH_BYTES = 16 * 1024 * 1024
+
+# What extract_zip() does with a file that already exists
+OVERWRITE_POLICIES = ("always", "if-changed", "never")
+
+# Profile -> deflate level and the smallest saving (as a fraction of the trial
+# block) that is still worth spending CPU on
+COMPRESSION_PROFILES = {
+    "fastest": {'level': 1, 'min_saving': 0.10},
+    "balanced": {'level': 6, 'min_saving': 0.03},
+    "smallest": {'level': 9, 'min_saving': 0.005},
+}
+
+STORED_EXTENSIONS = {
+    # images
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".avif", ".jp2",
+    # audio / video
+    ".mp3", ".aac", ".m4a", ".ogg", ".opus", ".flac", ".mp4", ".m4v", ".mov", ".mkv", ".avi", ".webm",
+    # archives and zip-based documents
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".zst", ".lz4",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".epub", ".jar", ".apk",
+    ".pdf",
+}
+
+# (offset, signature) of formats that are compressed internally
+STORED_MAGIC = (
+    (0, b"\xff\xd8\xff"),             # JPEG
+    (0, b"\x89PNG\r\n\x1a\n"),        # PNG
+    (0, b"GIF8"),
+    (0, b"PK\x03\x04"),               # zip and everything built on it
+    (0, b"\x1f\x8b"),                 # gzip
+    (0, b"BZh"),
+    (0, b"\xfd7zXZ\x00"),
+    (0, b"7z\xbc\xaf\x27\x1c"),
+    (0, b"Rar!\x1a\x07"),
+    (0, b"\x28\xb5\x2f\xfd"),         # zstd
+    (0, b"OggS"),
+    (0, b"fLaC"),
+    (0, b"ID3"),                       # MP3
+    (4, b"ftyp"),                      # MP4 / MOV / HEIC
+    (8, b"WEBP"),
+)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once ZipJob.cancel() has been called"""
+
+
+class ZipJob:
+    """Progress counters and a cancel flag shared by a worker thread and the UI.
+
+    The worker reports through update() and calls check() between chunks; the
+    UI reads snapshot() on its own schedule and may call cancel() at any time.
+    """
+
+    def __init__(self):
+        self.total_bytes = 0
+        self.total_files = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.bytes_skipped = 0
+        self.files_done = 0
+        self.started = time.perf_counter()
+        self.finished = False
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def set_totals(self, total_bytes, total_files):
+        with self._lock:
+            self.total_bytes = total_bytes
+            self.total_files = total_files
+            self.started = time.perf_counter()
+
+    def update(self, bytes_in=0, bytes_out=0, files=0, skipped=0):
+        with self._lock:
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.bytes_skipped += skipped
+            self.files_done += files
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def snapshot(self):
+        """Return the counters plus 'percent', 'mb_per_sec' and 'eta' (seconds or None)"""
+        with self._lock:
+            # The uncompressed side is the one the totals are counted in:
+            # bytes read when zipping, bytes written (or found already in place) when extracting
+            done = max(self.bytes_in, self.bytes_out) + self.bytes_skipped
+            elapsed = time.perf_counter() - self.started
+            rate = done / elapsed if elapsed > 0 else 0
+            remaining = max(self.total_bytes - done, 0)
+            return {
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'bytes_done': done,
+                'total_bytes': self.total_bytes,
+                'files_done': self.files_done,
+                'total_files': self.total_files,
+                'percent': 100.0 * done / self.total_bytes if self.total_bytes else 0.0,
+                'mb_per_sec': rate / (1024 * 1024),
+                'eta': remaining / rate if rate else None,
+            }
+
+
+def format_progress(snapshot):
+    """One line of progress, e.g. '120.0 / 480.0 MB, 35 / 200 files, 42.1 MB/s, 0:08 left'"""
+    mb = 1024 * 1024
+    eta = snapshot['eta']
+    left = "" if eta is None else f", {int(eta) // 60}:{int(eta) % 60:02d} left"
+    return (f"{snapshot['bytes_done'] / mb:.1f} / {snapshot['total_bytes'] / mb:.1f} MB, "
+            f"{snapshot['files_done']} / {snapshot['total_files']} files, "
+            f"{snapshot['mb_per_sec']:.1f} MB/s{left}")
+
+
+def iter_zip_sources(items):
+    """Yield (path, arcname) for every file in the selected files and folders.
+
+    Files keep their base name; folders are walked and keep their own name as
+    the top-level directory inside the archive.
+    """
+    for item_path in items:
+        if os.path.isfile(item_path):
+            yield item_path, os.path.basename(item_path)
+        elif os.path.isdir(item_path):
+            folder_name = os.path.basename(os.path.normpath(item_path))
+            for root, dirs, files in os.walk(item_path):
+                dirs.sort()
+                for file in sorted(files):
+                    file_path = os.path.join(root, file)
+                    yield file_path, os.path.join(folder_name, os.path.relpath(file_path, item_path))
+
+
+class CompressionPolicy:
+    """Chooses ZIP_STORED or ZIP_DEFLATED (and the level) for each file"""
+
+    def __init__(self, profile="balanced"):
+        if profile not in COMPRESSION_PROFILES:
+            raise ValueError(f"Unknown compression profile: {profile}")
+        self.profile = profile
+        self.level = COMPRESSION_PROFILES[profile]['level']
+        self.min_saving = COMPRESSION_PROFILES[profile]['min_saving']
+
+    def method_for(self, filename, head):
+        """Return the zip method for a file, given its name and first block"""
+        if os.path.splitext(filename)[1].lower() in STORED_EXTENSIONS:
+            return zipfile.ZIP_STORED
+        if any(head[offset:offset + len(magic)] == magic for offset, magic in STORED_MAGIC):
+            return zipfile.ZIP_STORED
+
+        # Small files are cheap to deflate whatever they hold
+        trial = head[:TRIAL_SIZE]
+        if len(trial) < TRIAL_SIZE:
+            return zipfile.ZIP_DEFLATED
+        saved = 1 - len(zlib.compress(trial, 1)) / len(trial)
+        return zipfile.ZIP_DEFLATED if saved >= self.min_saving else zipfile.ZIP_STORED
+
+
+def _deflate_chunk(data, level, zdict, last):
+    # Runs on a pool thread. Non-final chunks end with a sync flush, which
+    # leaves the stream open and byte-aligned for the next chunk.
+    if zdict:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelZipWriter:
+    """Creates a zip archive whose members are deflated on several threads.
+
+    add_file() reads a file in CHUNK_SIZE pieces and queues them for
+    compression; compressed pieces are written in submission order as soon as
+    they are ready. Only a few chunks per worker are in flight at any time,
+    so memory stays bounded however large the files are. Files the policy
+    says to store are copied through without touching the pool.
+    """
+
+    def __init__(self, zip_path, workers=None, profile="balanced", chunk_size=CHUNK_SIZE, job=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.job = job or ZipJob()
+        self.policy = CompressionPolicy(profile)
+        self.level = self.policy.level
+        self.chunk_size = chunk_size
+        self.files = 0
+        self.stored = 0
+        self.copied = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._zip = zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self._pending = deque()
+        self._member = None
+
+    def add_file(self, path, arcname):
+        zinfo = zipfile.ZipInfo.from_file(path, arcname)
+
+        crc = 0
+        size = 0
+        zdict = b""
+        with open(path, "rb") as f:
+            chunk = f.read(self.chunk_size)
+            zinfo.compress_type = self.policy.method_for(arcname, chunk)
+            self._pending.append(("start", zinfo))
+            while True:
+                # Read one chunk ahead to know which one is the last
+                next_chunk = f.read(self.chunk_size) if chunk else b""
+                last = not next_chunk
+                self.job.check()
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                self.job.update(bytes_in=len(chunk))
+                if zinfo.compress_type == zipfile.ZIP_STORED:
+                    self._pending.append(("raw", chunk))
+                else:
+                    self._pending.append(("data", self._pool.submit(_deflate_chunk, chunk, self.level, zdict, last)))
+                self._drain(self.workers * 4)
+                if last:
+                    break
+                zdict = chunk[-WINDOW_SIZE:]
+                chunk = next_chunk
+
+        self._pending.append(("end", (crc, size)))
+        self._drain(self.workers * 4)
+
+    def add_copy(self, source, info, zinfo):
+        """Copy a member's compressed bytes from another archive without recompressing.
+
+        source is that archive opened in binary mode and info its ZipInfo for
+        the member; zinfo describes the new entry (name, timestamp, mode) and
+        takes the old member's method, CRC and sizes.
+        """
+        zinfo.compress_type = info.compress_type
+        zinfo.file_size = info.file_size
+        self._pending.append(("start", zinfo))
+
+        source.seek(info.header_offset)
+        header = struct.unpack(zipfile.structFileHeader, source.read(zipfile.sizeFileHeader))
+        if header[zipfile._FH_SIGNATURE] != zipfile.stringFileHeader:
+            raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+        source.seek(header[zipfile._FH_FILENAME_LENGTH] + header[zipfile._FH_EXTRA_FIELD_LENGTH], os.SEEK_CUR)
+
+        remaining = info.compress_size
+        while remaining:
+            self.job.check()
+            data = source.read(min(self.chunk_size, remaining))
+            if not data:
+                raise zipfile.BadZipFile(f"{info.filename} is truncated")
+            remaining -= len(data)
+            self._pending.append(("raw", data))
+            self._drain(self.workers * 4)
+
+        # Progress is counted in uncompressed bytes, like a file read from disk
+        self.job.update(bytes_in=info.file_size)
+        self._pending.append(("end", (info.CRC, info.file_size)))
+        self._drain(self.workers * 4)
+        self.copied += 1
+
+    def _drain(self, keep):
+        # Write everything that is ready, and wait for chunks once more than `keep` are queued
+        while self._pending:
+            kind, payload = self._pending[0]
+            if kind == "data" and len(self._pending) <= keep and not payload.done():
+                break
+            self._pending.popleft()
+            if kind == "start":
+                self._start_member(payload)
+            elif kind in ("data", "raw"):
+                data = payload.result() if kind == "data" else payload
+                self._zip.fp.write(data)
+                self._member[2] += len(data)
+                self.job.update(bytes_out=len(data))
+            else:
+                self._end_member(*payload)
+
+    # The ZipFile is only used for its header and central directory code: members
+    # are appended to its file object directly and registered the way
+    # ZipFile.write() registers them, so close() writes a normal central directory.
+    def _start_member(self, zinfo):
+        zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+        zinfo.header_offset = self._zip.fp.tell()
+        zinfo.CRC = 0
+        zinfo.compress_size = 0
+        self._zip.fp.write(zinfo.FileHeader(zip64))
+        self._member = [zinfo, zip64, 0]
+
+    def _end_member(self, crc, size):
+        zinfo, zip64, compress_size = self._member
+        if not zip64 and max(size, compress_size) > zipfile.ZIP64_LIMIT:
+            raise RuntimeError(f"{zinfo.filename} grew past 4 GB while it was being zipped")
+        zinfo.CRC = crc
+        zinfo.file_size = size
+        zinfo.compress_size = compress_size
+
+        # Rewrite the local header now that CRC and sizes are known
+        end = self._zip.fp.tell()
+        self._zip.fp.seek(zinfo.header_offset)
+        self._zip.fp.write(zinfo.FileHeader(zip64))
+        self._zip.fp.seek(end)
+        self._zip.start_dir = end
+        self._zip.filelist.append(zinfo)
+        self._zip.NameToInfo[zinfo.filename] = zinfo
+
+        self._member = None
+        self.files += 1
+        self.job.update(files=1)
+        if zinfo.compress_type == zipfile.ZIP_STORED:
+            self.stored += 1
+        self.bytes_in += size
+        self.bytes_out += compress_size
+
+    def close(self):
+        try:
+            self._drain(0)
+        finally:
+            self._pool.shutdown(wait=True)
+            self._zip.close()
+
+    def abort(self):
+        """Stop without writing the queued members; the archive is left incomplete"""
+        self._pending.clear()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def create_zip(items, zip_path, workers=None, profile="balanced", job=None, update=False):
+    """Zip the given files and folders into zip_path. Returns the writer's counters.
+
+    The archive is built as zip_path + ".part" and only renamed into place
+    once complete; on cancellation (JobCancelled) or any error it is removed.
+
+    With update=True an existing zip_path is used as the starting point:
+    members whose file is unchanged are copied over still compressed, and
+    members whose file is no longer part of the selection are dropped. The
+    counters then also hold the 'added', 'changed' and 'removed' member names.
+    """
+    job = job or ZipJob()
+    sources = [(path, arcname, os.path.getsize(path)) for path, arcname in iter_zip_sources(items)]
+    job.set_totals(sum(size for _path, _arcname, size in sources), len(sources))
+
+    previous = _read_members(zip_path) if update else {}
+    changes = {'added': [], 'changed': [], 'removed': []}
+
+    partial = zip_path + ".part"
+    try:
+        with open(zip_path, "rb") if previous else nullcontext() as source, \
+                ParallelZipWriter(partial, workers=workers, profile=profile, job=job) as writer:
+            for path, arcname, _size in sources:
+                zinfo = zipfile.ZipInfo.from_file(path, arcname)
+                info = previous.pop(zinfo.filename, None)
+                if info is not None and _unchanged(path, zinfo, info):
+                    writer.add_copy(source, info, zinfo)
+                    continue
+                changes['added' if info is None else 'changed'].append(zinfo.filename)
+                writer.add_file(path, arcname)
+            changes['removed'] = sorted(previous)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        job.finished = True
+    os.replace(partial, zip_path)
+    counts = {'files': writer.files, 'stored': writer.stored, 'copied': writer.copied,
+              'bytes_in': writer.bytes_in, 'bytes_out': writer.bytes_out}
+    if update:
+        counts.update(changes)
+    return counts
+
+
+def _read_members(zip_path):
+    """Return {name: ZipInfo} for the file members of an existing archive.
+
+    A missing or unreadable archive has no members, so everything is zipped
+    afresh. Encrypted members are left out and so always recompressed.
+    """
+    try:
+        with zipfile.ZipFile(zip_path) as zipf:
+            return {info.filename: info for info in zipf.infolist()
+                    if not info.is_dir() and not info.flag_bits & 0x1}
+    except (OSError, zipfile.BadZipFile):
+        return {}
+
+
+def _dos_time(date_time):
+    # Zip timestamps only keep even seconds
+    return tuple(date_time[:5]) + (date_time[5] // 2 * 2,)
+
+
+def _unchanged(path, zinfo, info):
+    """Whether a file still holds what the archived member holds.
+
+    Size and timestamp matching is taken as unchanged; when only the timestamp
+    differs (a touched or re-copied file) the CRC decides.
+    """
+    if zinfo.file_size != info.file_size:
+        return False
+    if _dos_time(zinfo.date_time) == _dos_time(info.date_time):
+        return True
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+    return crc == info.CRC
+
+
+# ---------- Extraction ----------
+def member_path(extract_dir, name):
+    """Where a member is extracted to, sanitised the same way as ZipFile.extract()"""
+    arcname = name.replace("/", os.path.sep)
+    if os.path.altsep:
+        arcname = arcname.replace(os.path.altsep, os.path.sep)
+    # No drive letters, absolute paths, '.' or '..' components
+    arcname = os.path.splitdrive(arcname)[1]
+    parts = [part for part in arcname.split(os.path.sep) if part not in ("", os.path.curdir, os.path.pardir)]
+    if os.path.sep == "\\":
+        table = str.maketrans(':<>|"?*', "_______")
+        parts = [part.translate(table).rstrip(".") or "_" for part in parts]
+    return os.path.join(extract_dir, *parts)
+
+
+def extract_zip(zip_path, extract_dir, job=None, workers=None, overwrite="always"):
+    """Extract every member of zip_path into extract_dir. Returns {'written': n, 'skipped': n}.
+
+    Members are inflated by `workers` threads, each reading through its own
+    ZipFile handle. `overwrite` is one of OVERWRITE_POLICIES: "if-changed"
+    skips files whose size and CRC already match the member, "never" skips
+    every existing file.
+
+    Members are streamed to a .part file and renamed when complete. On
+    cancellation (JobCancelled) or any error, files and folders this run
+    created are removed again; files it had already overwritten stay replaced.
+    """
+    if overwrite not in OVERWRITE_POLICIES:
+        raise ValueError(f"Unknown overwrite policy: {overwrite}")
+    job = job or ZipJob()
+    workers = workers or os.cpu_count() or 1
+    counts = {'written': 0, 'skipped': 0}
+    created = []
+    created_dirs = []
+    handles = []
+    local = threading.local()
+    lock = threading.Lock()
+    failed = threading.Event()
+
+    def extract_batch(batch):
+        # Runs on a pool thread; ZipFile handles are not safe to share between threads
+        zipf = getattr(local, "zipf", None)
+        if zipf is None:
+            zipf = local.zipf = zipfile.ZipFile(zip_path, "r")
+            with lock:
+                handles.append(zipf)
+        for info, target in batch:
+            job.check()
+            if failed.is_set():
+                raise JobCancelled()
+
+            existed = os.path.exists(target)
+            if existed and (overwrite == "never" or (overwrite == "if-changed" and _same_file(target, info))):
+                job.update(files=1, skipped=info.file_size)
+                with lock:
+                    counts['skipped'] += 1
+                continue
+
+            _extract_member(zipf, info, target, job)
+            job.update(files=1)
+            with lock:
+                if not existed:
+                    created.append(target)
+                counts['written'] += 1
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zipf:
+            members = zipf.infolist()
+
+        # Folders are made up front on this thread, so workers only ever create files
+        files = []
+        for info in members:
+            target = member_path(extract_dir, info.filename)
+            _make_dirs(target if info.is_dir() else os.path.dirname(target), created_dirs)
+            if not info.is_dir():
+                files.append((info, target))
+        job.set_totals(sum(info.file_size for info, _target in files), len(files))
+
+        futures = [pool.submit(extract_batch, batch) for batch in _batches(files)]
+        for future in futures:
+            future.result()
+    except BaseException:
+        failed.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+        for path in reversed(created):
+            if os.path.exists(path):
+                os.remove(path)
+        for folder in reversed(created_dirs):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                pass
+        raise
+    finally:
+        pool.shutdown(wait=True)
+        for zipf in handles:
+            zipf.close()
+        job.finished = True
+    return counts
+
+
+def _batches(files):
+    # Group small members so each pool task does a worthwhile amount of work
+    batch = []
+    size = 0
+    for info, target in files:
+        batch.append((info, target))
+        size += info.file_size
+        if len(batch) >= EXTRACT_BATCH_FILES or size >= EXTRACT_BATCH_BYTES:
+            yield batch
+            batch = []
+            size = 0
+    if batch:
+        yield batch
+
+
+def _same_file(path, info):
+    """True if the file at path already holds the member's bytes (size first, then CRC)"""
+    try:
+        if os.path.getsize(path) != info.file_size:
+            return False
+        crc = 0
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                crc = zlib.crc32(block, crc)
+    except OSError:
+        return False
+    return crc == info.CRC
+
+
+def _make_dirs(folder, created_dirs):
+    # Like os.makedirs, but remembers which folders it created so they can be removed again
+    missing = []
+    while folder and not os.path.isdir(folder):
+        missing.append(folder)
+        folder = os.path.dirname(folder)
+    for folder in reversed(missing):
+        os.mkdir(folder)
+        created_dirs.append(folder)
+
+
+def _extract_member(zipf, info, target, job):
+    # Even small members go through the .part file: a failed write must not
+    # truncate or remove a file that was already there
+    partial = target + ".part"
+    try:
+        if info.file_size <= CHUNK_SIZE:
+            # One read and one write
+            data = zipf.read(info)
+            with open(partial, "wb") as out:
+                out.write(data)
+            job.update(bytes_out=len(data))
+        else:
+            with zipf.open(info) as source, open(partial, "wb") as out:
+                while True:
+                    job.check()
+                    block = source.read(CHUNK_SIZE)
+                    if not block:
+                        break
+                    out.write(block)
+                    job.update(bytes_out=len(block))
+        job.update(bytes_in=info.compress_size)
+        os.replace(partial, target)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+
+# ---------- CLI ----------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Create a zip archive, compressing on several threads.")
+    parser.add_argument("zip_path", help="archive to create (or refresh, with --update)")
+    parser.add_argument("items", nargs="+", help="files and folders to add")
+    parser.add_argument("-j", "--jobs", type=int, default=0,
+                        help="compression threads (0 = one per CPU core)")
+    parser.add_argument("-p", "--profile", choices=list(COMPRESSION_PROFILES), default="balanced",
+                        help="compression profile (default balanced)")
+    parser.add_argument("-u", "--update", action="store_true",
+                        help="refresh an existing archive, recompressing only new and changed files")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    counts = create_zip(args.items, args.zip_path, workers=args.jobs or None, profile=args.profile,
+                        update=args.update)
+    elapsed = time.perf_counter() - start
+    mb = counts['bytes_in'] / (1024 * 1024)
+    print(f"Zipped {counts['files']} files ({counts['stored']} stored as-is), "
+          f"{mb:.1f} MB -> {counts['bytes_out'] / (1024 * 1024):.1f} MB "
+          f"in {elapsed:.1f}s ({mb / elapsed if elapsed else 0:.1f} MB/s)")
+    if args.update:
+        print(f"{counts['copied']} unchanged, {len(counts['added'])} added, {len(counts['changed'])} changed, "
+              f"{len(counts['removed'])} removed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
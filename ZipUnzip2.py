@@ -2,10 +2,10 @@ from ttkbootstrap import *
 from ttkbootstrap.scrolled import ScrolledFrame
 from tkinter import filedialog, messagebox, StringVar, BooleanVar
 from tkinter.constants import *
-import zipfile
 import os
 from pathlib import Path
 import threading
+from ZipEngine import COMPRESSION_PROFILES, JobCancelled, ZipJob, create_zip, extract_zip, format_progress
 
 class ZipManagerApp(Window):
     def __init__(self):
@@ -46,6 +46,20 @@ class ZipManagerApp(Window):
         # Status label
         self.status_label = Label(self.main_frame, text="Ready", foreground="gray")
         self.status_label.pack(pady=10)
+        
+        # Progress of the running job - refreshed by poll_job() a few times a second
+        self.job = None
+        self.job_frame = Frame(self.main_frame)
+        self.job_frame.pack(fill=X, padx=10)
+        
+        self.job_progress = Progressbar(self.job_frame, maximum=100, bootstyle=SUCCESS)
+        self.job_progress.pack(fill=X, pady=(0, 5))
+        
+        self.job_label = Label(self.job_frame, text="", foreground="gray")
+        self.job_label.pack(side=LEFT)
+        
+        self.cancel_button = Button(self.job_frame, text="Cancel", command=self.cancel_job, bootstyle=DANGER, state="disabled")
+        self.cancel_button.pack(side=RIGHT)
     
     def setup_zip_tab(self):
         # Main container for zip tab with scroll
@@ -105,6 +119,24 @@ class ZipManagerApp(Window):
         self.zip_name_entry = Entry(self.zip_name_frame, textvariable=self.zip_name_var, bootstyle=INFO)
         self.zip_name_entry.pack(fill=X)
         
+        # Compression profile - already-compressed files are stored either way
+        self.compression_frame = Frame(self.options_frame)
+        self.compression_frame.pack(fill=X, pady=(0, 10))
+        
+        self.compression_label = Label(self.compression_frame, text="Compression:")
+        self.compression_label.pack(anchor=W, pady=(0, 5))
+        
+        self.compression_var = StringVar(value="balanced")
+        self.compression_combo = Combobox(self.compression_frame, textvariable=self.compression_var,
+                                          values=list(COMPRESSION_PROFILES), state="readonly", bootstyle=INFO)
+        self.compression_combo.pack(fill=X)
+        
+        # Update mode - unchanged members are copied from the existing archive as they are
+        self.update_var = BooleanVar(value=False)
+        self.update_check = Checkbutton(self.options_frame, text="Update existing archive (only recompress changed files)",
+                                        variable=self.update_var, bootstyle="round-toggle")
+        self.update_check.pack(anchor=W, pady=(0, 10))
+        
         # Zip button frame - Making it more prominent
         self.zip_button_frame = Frame(self.zip_container)
         self.zip_button_frame.pack(fill=X, pady=20)
@@ -254,12 +286,46 @@ class ZipManagerApp(Window):
             auto_path = os.path.join(default_dir, default_name)
             self.output_path_var.set(auto_path)
         
+        if self.job is not None:
+            return
+        self.start_job()
+        
         # Run in separate thread to avoid freezing the UI
-        thread = threading.Thread(target=self.create_zip)
+        thread = threading.Thread(target=self.create_zip, args=(self.job,))
         thread.daemon = True
         thread.start()
     
-    def create_zip(self):
+    # ---------- Job progress ----------
+    def start_job(self):
+        self.job = ZipJob()
+        self.job_progress.config(value=0)
+        self.cancel_button.config(state="normal")
+        self.poll_job()
+    
+    def poll_job(self):
+        # Runs on the Tk thread; the worker never touches widgets for progress
+        if self.job is None:
+            return
+        snapshot = self.job.snapshot()
+        self.job_progress.config(value=snapshot['percent'])
+        self.job_label.config(text=format_progress(snapshot))
+        if not self.job.finished:
+            self.after(250, self.poll_job)
+    
+    def cancel_job(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.cancel_button.config(state="disabled")
+            self.status_label.config(text="Cancelling...", foreground="gray")
+    
+    def end_job(self):
+        if self.job is not None:
+            self.job.finished = True
+            self.job_label.config(text=format_progress(self.job.snapshot()))
+        self.job = None
+        self.cancel_button.config(state="disabled")
+    
+    def create_zip(self, job):
         try:
             self.after(0, lambda: self.status_label.config(
                 text="Creating zip archive...", 
@@ -267,31 +333,30 @@ class ZipManagerApp(Window):
             ))
             self.after(0, lambda: self.zip_button.config(state="disabled"))
             
-            compression = zipfile.ZIP_DEFLATED
+            # Files are deflated on one thread per core and written in order by this one
+            counts = create_zip(self.selected_items, self.output_path_var.get(), profile=self.compression_var.get(),
+                                job=job, update=self.update_var.get())
             
-            with zipfile.ZipFile(self.output_path_var.get(), 'w', compression=compression) as zipf:
-                for item_path in self.selected_items:
-                    if os.path.isfile(item_path):
-                        # Add individual file
-                        zipf.write(item_path, os.path.basename(item_path))
-                    elif os.path.isdir(item_path):
-                        # Add folder and all its contents
-                        folder_name = os.path.basename(item_path)
-                        for root, dirs, files in os.walk(item_path):
-                            for file in files:
-                                file_path = os.path.join(root, file)
-                                # Create relative path for zip
-                                arcname = os.path.join(folder_name, os.path.relpath(file_path, item_path))
-                                zipf.write(file_path, arcname)
+            self.after(0, self.end_job)
             
+            summary = ""
+            if 'added' in counts:
+                summary = (f" ({counts['copied']} unchanged, {len(counts['added'])} added, "
+                           f"{len(counts['changed'])} changed, {len(counts['removed'])} removed)")
             self.after(0, lambda: self.status_label.config(
-                text=f"Zip created successfully: {os.path.basename(self.output_path_var.get())}", 
+                text=f"Zip created successfully: {os.path.basename(self.output_path_var.get())}{summary}", 
                 foreground="green"
             ))
             self.after(0, lambda: self.zip_button.config(state="normal"))
             self.after(0, lambda: messagebox.showinfo("Success", "Zip archive created successfully!"))
             
+        except JobCancelled:
+            self.after(0, self.end_job)
+            self.after(0, lambda: self.status_label.config(text="Zip cancelled - partial archive removed", foreground="gray"))
+            self.after(0, lambda: self.zip_button.config(state="normal"))
+            
         except Exception as e:
+            self.after(0, self.end_job)
             self.after(0, lambda: self.status_label.config(
                 text=f"Error: {str(e)}", 
                 foreground="red"
@@ -311,12 +376,16 @@ class ZipManagerApp(Window):
             messagebox.showerror("Error", "Please select extraction directory")
             return
         
+        if self.job is not None:
+            return
+        self.start_job()
+        
         # Run in separate thread to avoid freezing the UI
-        thread = threading.Thread(target=self.extract_zip, args=(zip_file, extract_dir))
+        thread = threading.Thread(target=self.extract_zip, args=(zip_file, extract_dir, self.job))
         thread.daemon = True
         thread.start()
     
-    def extract_zip(self, zip_file, extract_dir):
+    def extract_zip(self, zip_file, extract_dir, job):
         try:
             self.after(0, lambda: self.status_label.config(
                 text="Extracting archive...", 
@@ -324,9 +393,12 @@ class ZipManagerApp(Window):
             ))
             self.after(0, lambda: self.unzip_button.config(state="disabled"))
             
-            with zipfile.ZipFile(zip_file, 'r') as zipf:
-                # Extract all files, overwriting if the option is selected
-                zipf.extractall(extract_dir)
+            # Members are inflated on one thread per core. With "Overwrite" on, files that
+            # already match (size + CRC) are left alone; with it off, existing files are kept
+            overwrite = "if-changed" if self.overwrite_var.get() else "never"
+            extract_zip(zip_file, extract_dir, job=job, overwrite=overwrite)
+            
+            self.after(0, self.end_job)
             
             self.after(0, lambda: self.status_label.config(
                 text=f"Extraction completed to: {os.path.basename(extract_dir)}", 
@@ -335,7 +407,13 @@ class ZipManagerApp(Window):
             self.after(0, lambda: self.unzip_button.config(state="normal"))
             self.after(0, lambda: messagebox.showinfo("Success", "Archive extracted successfully!"))
             
+        except JobCancelled:
+            self.after(0, self.end_job)
+            self.after(0, lambda: self.status_label.config(text="Extraction cancelled - new files removed", foreground="gray"))
+            self.after(0, lambda: self.unzip_button.config(state="normal"))
+            
         except Exception as e:
+            self.after(0, self.end_job)
             self.after(0, lambda: self.status_label.config(
                 text=f"Error: {str(e)}", 
                 foreground="red"
@@ -0,0 +1,304 @@
+"""Benchmarks for PDF text and image extraction.
+
+Generates synthetic PDFs locally (nothing is downloaded), runs the headless
+extraction paths of PDFextractEngine.py and ImageExtractfrompdf.py against
+them and reports pages/sec, MB/sec and peak RSS. Every case runs in its own
+subprocess so peak RSS belongs to that case alone. Parallel cases also report
+the largest peak RSS among their pool's worker processes ("child RSS").
+
+Results are appended to benchmarks/results.jsonl together with the current
+git commit, and each run is compared against the previous result for the same
+case, so regressions between commits show up as a percentage change.
+
+Usage:
+    python benchmarks/bench_extract.py                  # all cases
+    python benchmarks/bench_extract.py -k text -k pypdf2
+    python benchmarks/bench_extract.py --scale 0.2      # quicker, smaller PDFs
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+
+DATA_DIR = os.path.join(HERE, ".data")
+RESULTS_PATH = os.path.join(HERE, "results.jsonl")
+
+WORDS = ("agreement party clause term notice payment liability service "
+         "invoice schedule delivery warranty renewal confidential").split()
+
+
+# ---------- Synthetic PDFs ----------
+def _lines(rng, count, words=12):
+    return [" ".join(rng.choice(WORDS) for _ in range(words)) for _ in range(count)]
+
+
+def make_text_heavy(path, pages, rng):
+    import fitz
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (36, 36, -36, -36), "\n".join(_lines(rng, 60)), fontsize=9)
+    doc.save(path, deflate=True)
+
+
+def make_many_small(path, pages, rng):
+    import fitz
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page(width=200, height=100)
+        page.insert_text((10, 50), " ".join(_lines(rng, 1, 4)), fontsize=8)
+    doc.save(path, deflate=True)
+
+
+def make_few_huge(path, pages, rng):
+    import fitz
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page(width=3000, height=3000)
+        page.insert_textbox(page.rect + (20, 20, -20, -20), "\n".join(_lines(rng, 700, 40)), fontsize=4)
+    doc.save(path, deflate=True)
+
+
+def make_image_heavy(path, pages, rng):
+    import fitz
+    from PIL import Image
+    import io
+
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        for slot in range(4):
+            # Noise does not compress, so each image costs real decode/write work
+            img = Image.frombytes("RGB", (256, 256), rng.randbytes(256 * 256 * 3))
+            buf = io.BytesIO()
+            img.save(buf, "JPEG" if slot % 2 else "PNG")
+            x, y = 36 + (slot % 2) * 270, 36 + (slot // 2) * 370
+            page.insert_image(fitz.Rect(x, y, x + 256, y + 256), stream=buf.getvalue())
+    doc.save(path)
+
+
+DOCUMENTS = {
+    # name: (generator, pages at scale 1.0)
+    "text_heavy": (make_text_heavy, 300),
+    "many_small": (make_many_small, 3000),
+    "few_huge": (make_few_huge, 4),
+    "image_heavy": (make_image_heavy, 60),
+}
+
+
+def ensure_document(name, scale):
+    """Generate (once) and return the path of a synthetic PDF"""
+    make, pages = DOCUMENTS[name]
+    pages = max(1, int(pages * scale))
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"{name}_{pages}.pdf")
+    if not os.path.exists(path):
+        make(path + ".part", pages, random.Random(name))
+        os.replace(path + ".part", path)
+    return path
+
+
+# ---------- Cases ----------
+def run_text(pdf, backend="auto", workers=1):
+    from PDFextractEngine import extract_pages
+    pages = 0
+    for _page_no, _text in extract_pages(pdf, workers=workers, backend=backend):
+        pages += 1
+    return pages
+
+
+def run_images(pdf, workers=1):
+    from PDFImageEngine import extract_images_parallel, iter_extract_images
+    import fitz
+
+    out = tempfile.mkdtemp(prefix="bench_images_")
+    try:
+        if workers == 1:
+            images = iter_extract_images(pdf, out)
+        else:
+            images = extract_images_parallel(pdf, out, workers=workers)
+        for _info in images:
+            pass
+    finally:
+        shutil.rmtree(out, ignore_errors=True)
+    with fitz.open(pdf) as doc:
+        return len(doc)
+
+
+def run_render(pdf, workers=1):
+    from PDFImageEngine import render_pages
+
+    out = tempfile.mkdtemp(prefix="bench_render_")
+    try:
+        pages = 0
+        for _info in render_pages(pdf, out, dpi=150, workers=workers):
+            pages += 1
+    finally:
+        shutil.rmtree(out, ignore_errors=True)
+    return pages
+
+
+CASES = {
+    # name: (document, runner, kwargs)
+    "text/pymupdf/text_heavy": ("text_heavy", run_text, {'backend': "pymupdf"}),
+    "text/pypdf2/text_heavy": ("text_heavy", run_text, {'backend': "pypdf2"}),
+    "text/pypdf2-parallel/text_heavy": ("text_heavy", run_text, {'backend': "pypdf2", 'workers': 0}),
+    "text/pymupdf/many_small": ("many_small", run_text, {'backend': "pymupdf"}),
+    "text/pypdf2/many_small": ("many_small", run_text, {'backend': "pypdf2"}),
+    "text/pymupdf/few_huge": ("few_huge", run_text, {'backend': "pymupdf"}),
+    "text/pypdf2/few_huge": ("few_huge", run_text, {'backend': "pypdf2"}),
+    "images/image_heavy": ("image_heavy", run_images, {}),
+    "images-parallel/image_heavy": ("image_heavy", run_images, {'workers': 0}),
+    "images/text_heavy": ("text_heavy", run_images, {}),
+    "render/text_heavy": ("text_heavy", run_render, {}),
+    "render-parallel/text_heavy": ("text_heavy", run_render, {'workers': 0}),
+}
+
+
+def peak_rss_mb(children=False):
+    """Peak resident set size in MB, or None if unknown.
+
+    With children=True this is the largest peak among the finished child
+    processes (the workers of a process pool) instead of this process.
+    """
+    try:
+        import resource
+    except ImportError:
+        if children:
+            return None
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case_here(name, pdf):
+    """Run one case in this process and return its measurements"""
+    _doc, runner, kwargs = CASES[name]
+    kwargs = dict(kwargs)
+    if kwargs.get('workers') == 0:
+        kwargs['workers'] = os.cpu_count() or 1
+
+    start = time.perf_counter()
+    pages = runner(pdf, **kwargs)
+    seconds = time.perf_counter() - start
+    size_mb = os.path.getsize(pdf) / (1024 * 1024)
+    # Pool workers have exited by now, so RUSAGE_CHILDREN covers all of them
+    rss, child_rss = peak_rss_mb(), peak_rss_mb(children=True)
+    return {
+        'case': name,
+        'pages': pages,
+        'seconds': round(seconds, 4),
+        'pages_per_sec': round(pages / seconds, 1) if seconds else None,
+        'mb_per_sec': round(size_mb / seconds, 2) if seconds else None,
+        'input_mb': round(size_mb, 2),
+        'peak_rss_mb': None if rss is None else round(rss, 1),
+        'child_peak_rss_mb': round(child_rss, 1) if child_rss else None,
+    }
+
+
+def run_case(name, pdf):
+    # A fresh interpreter per case keeps peak RSS from leaking between cases
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case", name, pdf],
+        capture_output=True, text=True, cwd=REPO
+    )
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# ---------- Results ----------
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=REPO)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def load_previous(path):
+    """Return {(case, scale): last recorded result}"""
+    previous = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                previous[record['case'], record.get('scale', 1.0)] = record
+    return previous
+
+
+def change(new, old):
+    if not old or not new:
+        return ""
+    return f"{(new - old) / old * 100:+.0f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PDF text and image extraction.")
+    parser.add_argument("-k", dest="filters", action="append", default=[],
+                        help="only run cases whose name contains this text (repeatable)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply synthetic page counts")
+    parser.add_argument("--results", default=RESULTS_PATH, help="JSONL file to append results to")
+    parser.add_argument("--no-save", action="store_true", help="do not record this run")
+    parser.add_argument("--list", action="store_true", help="list cases and exit")
+    parser.add_argument("--run-case", nargs=2, metavar=("CASE", "PDF"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case_here(*args.run_case)))
+        return 0
+
+    names = [n for n in CASES if all(f in n for f in args.filters)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    previous = load_previous(args.results)
+    commit = git_commit()
+    stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    print(f"{'case':34} {'pages':>6} {'pages/s':>9} {'MB/s':>7} {'RSS MB':>7} {'child':>7}  vs last")
+    failed = 0
+    for name in names:
+        pdf = ensure_document(CASES[name][0], args.scale)
+        try:
+            result = run_case(name, pdf)
+        except RuntimeError as e:
+            print(f"{name:34} FAILED: {e}")
+            failed += 1
+            continue
+
+        old = previous.get((name, args.scale), {})
+        print(f"{name:34} {result['pages']:>6} {result['pages_per_sec']:>9} {result['mb_per_sec']:>7} "
+              f"{result['peak_rss_mb']!s:>7} {result.get('child_peak_rss_mb') or '-'!s:>7}  "
+              f"{change(result['pages_per_sec'], old.get('pages_per_sec'))}"
+              f"{' (' + old['commit'] + ')' if old.get('commit') else ''}")
+
+        if not args.no_save:
+            result.update(commit=commit, time=stamp, scale=args.scale, python=sys.version.split()[0])
+            with open(args.results, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result) + "\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
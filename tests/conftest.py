@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# The modules under test live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def text_pdf(tmp_path):
+    """Factory for small text PDFs: text_pdf(name, pages) -> path.
+
+    Page n reads "page n marker<n> alpha beta"; pages listed in `blank` have
+    no text at all.
+    """
+    fitz = pytest.importorskip("fitz")
+
+    def make(name="doc.pdf", pages=5, blank=()):
+        doc = fitz.open()
+        for page_no in range(1, pages + 1):
+            page = doc.new_page()
+            if page_no not in blank:
+                page.insert_text((72, 72), f"page {page_no} marker{page_no} alpha beta")
+        path = str(tmp_path / name)
+        doc.save(path)
+        doc.close()
+        return path
+
+    return make
@@ -0,0 +1,62 @@
+"""PDFBackends: backend order, per-page fallback and the report counters."""
+import pytest
+
+pytest.importorskip("PyPDF2")
+pytest.importorskip("fitz")
+
+from PDFBackends import PDFDocument, PyMuPDFBackend, backend_order, format_report, merge_report  # noqa: E402
+
+
+def test_backend_order():
+    assert backend_order("auto") == ["pymupdf", "pypdf2"]
+    assert backend_order("pypdf2") == ["pypdf2", "pymupdf"]
+    assert backend_order("pypdf2", fallback=False) == ["pypdf2"]
+    with pytest.raises(ValueError):
+        backend_order("poppler")
+
+
+def test_both_backends_read_the_same_pages(text_pdf):
+    pdf = text_pdf(pages=2)
+    for backend in ("pymupdf", "pypdf2"):
+        with PDFDocument(pdf, backend, fallback=False) as doc:
+            assert doc.backend_name == backend and doc.page_count == 2
+            assert "marker2" in doc.page_text(2)
+            assert doc.report[backend]['pages'] == 1
+
+
+def test_failing_backend_falls_back_page_by_page(text_pdf, monkeypatch):
+    def broken(self, page_no):
+        if page_no == 2:
+            raise RuntimeError("cannot parse page")
+        return original(self, page_no)
+
+    original = PyMuPDFBackend.page_text
+    monkeypatch.setattr(PyMuPDFBackend, "page_text", broken)
+    with PDFDocument(text_pdf(pages=3)) as doc:
+        texts = [doc.page_text(page_no) for page_no in (1, 2, 3)]
+        report = doc.report
+    assert all(f"marker{page_no}" in text for page_no, text in zip((1, 2, 3), texts))
+    assert report['pymupdf']['pages'] == 2 and report['pymupdf']['errors'] == 1
+    assert report['pypdf2']['pages'] == 1
+
+
+def test_empty_page_tries_every_backend(text_pdf):
+    with PDFDocument(text_pdf(pages=2, blank=(2,))) as doc:
+        assert doc.page_text(2) == ""
+        assert doc.report['pymupdf']['empty'] == 1 and doc.report['pypdf2']['empty'] == 1
+
+
+def test_unreadable_file_raises(tmp_path):
+    path = tmp_path / "bad.pdf"
+    path.write_bytes(b"not a pdf")
+    with pytest.raises(Exception):
+        PDFDocument(str(path))
+
+
+def test_merge_and_format_report():
+    total = {}
+    merge_report(total, {'pymupdf': {'pages': 2, 'empty': 0, 'errors': 1, 'seconds': 0.5}})
+    merge_report(total, {'pymupdf': {'pages': 3, 'empty': 1, 'errors': 0, 'seconds': 0.25}})
+    merge_report(None, total)
+    assert total == {'pymupdf': {'pages': 5, 'empty': 1, 'errors': 1, 'seconds': 0.75}}
+    assert format_report(total) == "pymupdf: 5 pages, 1 empty, 1 errors in 0.75s"
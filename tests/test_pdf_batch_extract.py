@@ -0,0 +1,42 @@
+"""PDFBatchExtract: one .txt per PDF and a manifest that makes reruns resume."""
+import json
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip("PyPDF2")
+
+from PDFBatchExtract import MANIFEST_NAME, load_manifest, run_batch  # noqa: E402
+
+
+def test_batch_extracts_and_resumes(tmp_path, text_pdf):
+    src = tmp_path / "in"
+    (src / "sub").mkdir(parents=True)
+    shutil.move(text_pdf("a.pdf", pages=2), str(src / "a.pdf"))
+    shutil.move(text_pdf("b.pdf", pages=3), str(src / "sub" / "b.pdf"))
+    (src / "broken.pdf").write_bytes(b"not a pdf")
+    out = tmp_path / "out"
+
+    assert run_batch(str(src), str(out), workers=1) == {'done': 2, 'skipped': 0, 'failed': 1}
+    with open(str(out / "sub" / "b.txt"), encoding="utf-8") as f:
+        assert "marker3" in f.read()
+    assert not os.path.exists(str(out / "broken.txt"))
+    assert sorted(load_manifest(str(out / MANIFEST_NAME))) == ["a.pdf", os.path.join("sub", "b.pdf")]
+
+    # Finished files are skipped; failed ones are tried again
+    assert run_batch(str(src), str(out), workers=1) == {'done': 0, 'skipped': 2, 'failed': 1}
+
+    shutil.move(text_pdf("c.pdf", pages=1), str(src / "a.pdf"))
+    os.utime(str(src / "a.pdf"), (1, 1))
+    assert run_batch(str(src), str(out), workers=1) == {'done': 1, 'skipped': 1, 'failed': 1}
+
+
+def test_torn_manifest_line_is_ignored(tmp_path):
+    manifest = tmp_path / MANIFEST_NAME
+    manifest.write_text(
+        json.dumps({'source': "a.pdf", 'status': "done", 'size': 1, 'mtime': 2}) + "\n"
+        + json.dumps({'source': "b.pdf", 'status': "done", 'size': 1, 'mtime': 2}) + "\n"
+        + json.dumps({'source': "b.pdf", 'status': "error", 'error': "x"}) + "\n"
+        + '{"source": "c.pdf", "sta', encoding="utf-8")
+    assert list(load_manifest(str(manifest))) == ["a.pdf"]
@@ -0,0 +1,336 @@
+"""Behaviour of the streaming text engine: page order, ranges, the page
+cache, lazy random access, background jobs and export formats."""
+import gzip
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("PyPDF2")
+
+import PDFTextCache  # noqa: E402
+from PDFTextCache import PageTextCache  # noqa: E402
+import PDFextractEngine  # noqa: E402
+from PDFextractEngine import (  # noqa: E402
+    BackgroundExport, BackgroundExtraction, LazyPageSource, export_format, export_pages, extract_to_file,
+    iter_pages, iter_pages_cached, iter_pages_parallel, iter_pdf_paths, page_count, split_range, stream_text,
+)
+
+
+def marker(page_no):
+    return f"marker{page_no}"
+
+
+# ---------- Serial extraction ----------
+def test_iter_pages_yields_numbered_pages_in_order(text_pdf):
+    pdf = text_pdf(pages=4)
+    pages = list(iter_pages(pdf))
+    assert [page_no for page_no, _text in pages] == [1, 2, 3, 4]
+    assert all(marker(page_no) in text for page_no, text in pages)
+    assert page_count(pdf) == 4
+
+
+def test_iter_pages_clamps_the_range(text_pdf):
+    pdf = text_pdf(pages=5)
+    assert [page_no for page_no, _text in iter_pages(pdf, first=0, last=99)] == [1, 2, 3, 4, 5]
+    assert [page_no for page_no, _text in iter_pages(pdf, first=3, last=4)] == [3, 4]
+
+
+def test_stream_text_and_extract_to_file(text_pdf, tmp_path):
+    pdf = text_pdf(pages=3)
+    out = io.StringIO()
+    assert stream_text(iter_pages(pdf), out.write) == 3
+    assert out.getvalue().count("\n") >= 3
+
+    save_path = str(tmp_path / "out.txt")
+    assert extract_to_file(pdf, save_path, first=2) == 2
+    with open(save_path, encoding="utf-8") as f:
+        text = f.read()
+    assert marker(2) in text and marker(3) in text and marker(1) not in text
+
+
+def test_iter_pdf_paths_walks_folders(tmp_path):
+    for name in ("b.pdf", "a.PDF", "notes.txt", os.path.join("sub", "c.pdf")):
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b"")
+    found = [os.path.relpath(path, tmp_path) for path in iter_pdf_paths([str(tmp_path)])]
+    assert found == ["a.PDF", "b.pdf", os.path.join("sub", "c.pdf")]
+
+
+# ---------- Parallel extraction ----------
+def test_split_range():
+    assert split_range(1, 10, 3) == [(1, 4), (5, 7), (8, 10)]
+    assert split_range(3, 4, 8) == [(3, 3), (4, 4)]
+    assert split_range(5, 4, 2) == []
+
+
+def test_parallel_pages_match_serial_pages(text_pdf):
+    pdf = text_pdf(pages=9)
+    parallel = list(iter_pages_parallel(pdf, first=2, last=8, workers=2, chunk_pages=2))
+    assert parallel == list(iter_pages(pdf, first=2, last=8))
+
+
+def test_closing_the_parallel_generator_early(text_pdf):
+    pdf = text_pdf(pages=12)
+    pages = iter_pages_parallel(pdf, workers=2, chunk_pages=1)
+    assert next(pages)[0] == 1
+    pages.close()
+
+
+# ---------- Cached extraction ----------
+def spy_extraction(monkeypatch):
+    """Record the (first, last) ranges that really reach the extractor"""
+    calls = []
+    extract_pages = PDFextractEngine.extract_pages
+
+    def spy(filename, first=1, last=None, *args):
+        calls.append((first, last))
+        return extract_pages(filename, first, last, *args)
+
+    monkeypatch.setattr(PDFextractEngine, "extract_pages", spy)
+    return calls
+
+
+def test_cached_run_is_served_from_the_cache(text_pdf, monkeypatch):
+    pdf = text_pdf(pages=6)
+    cache = PageTextCache(":memory:")
+    first_run = list(iter_pages_cached(pdf, cache))
+
+    calls = spy_extraction(monkeypatch)
+    assert list(iter_pages_cached(pdf, cache)) == first_run == list(iter_pages(pdf))
+    assert calls == []
+    assert cache.stats()['hits'] == 6
+
+
+def test_only_missing_pages_are_extracted(text_pdf, monkeypatch):
+    pdf = text_pdf(pages=10)
+    cache = PageTextCache(":memory:")
+    list(iter_pages_cached(pdf, cache, 3, 5))
+    list(iter_pages_cached(pdf, cache, 7, 8))
+
+    calls = spy_extraction(monkeypatch)
+    assert list(iter_pages_cached(pdf, cache)) == list(iter_pages(pdf))
+    assert calls == [(1, 2), (6, 6), (9, 10)]
+
+
+def test_cached_pages_are_kept_per_backend(text_pdf, monkeypatch):
+    pdf = text_pdf(pages=3)
+    cache = PageTextCache(":memory:")
+    list(iter_pages_cached(pdf, cache, backend="pymupdf"))
+
+    calls = spy_extraction(monkeypatch)
+    list(iter_pages_cached(pdf, cache, backend="pypdf2"))
+    assert calls == [(1, 3)]
+
+
+# ---------- Random access ----------
+def test_lazy_source_reads_pages_on_demand(text_pdf):
+    source = LazyPageSource(text_pdf(pages=8), keep_pages=2)
+    try:
+        assert source.page_count == 8
+        assert marker(5) in source.get(5)
+        source.get(1)
+        source.get(2)
+        assert list(source._pages) == [1, 2]  # only keep_pages pages stay in memory
+        with pytest.raises(IndexError):
+            source.get(9)
+    finally:
+        source.close()
+    with pytest.raises(ValueError):
+        source.get(1)
+
+
+def test_viewed_and_prefetched_pages_reach_the_cache_before_close(text_pdf, tmp_path):
+    cache_path = str(tmp_path / "pages.sqlite3")
+    cache = PageTextCache(cache_path)
+    source = LazyPageSource(text_pdf(pages=8), cache=cache)
+    try:
+        source.get(1)
+        source.flush()
+        source.prefetch(range(2, 6))
+        deadline = time.time() + 10
+        count = 0
+        while time.time() < deadline:
+            # A second connection only sees committed rows
+            with sqlite3.connect(cache_path) as db:
+                count = db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            if count == 5:
+                break
+            time.sleep(0.05)
+        assert count == 5
+    finally:
+        source.close()
+        cache.close()
+
+
+def test_opening_does_not_wait_for_the_file_hash(text_pdf, monkeypatch):
+    release = threading.Event()
+    file_digest = PDFTextCache.file_digest
+    monkeypatch.setattr(PDFTextCache, "file_digest", lambda path: release.wait(10) and file_digest(path))
+    cache = PageTextCache(":memory:")
+    pdf = text_pdf(pages=4)
+    source = LazyPageSource(pdf, cache=cache)
+    try:
+        # Served while the file is still being hashed, and cached once it is
+        assert marker(1) in source.get(1)
+        release.set()
+        source.prefetch([2])
+        key = PDFextractEngine.document_key(cache.document_hash(pdf))
+        deadline = time.time() + 10
+        while cache.get(key, 2) is None and time.time() < deadline:
+            time.sleep(0.05)
+        assert marker(1) in cache.get(key, 1) and marker(2) in cache.get(key, 2)
+    finally:
+        source.close()
+
+
+def test_pages_in_memory_stay_readable_during_an_extraction(text_pdf):
+    source = LazyPageSource(text_pdf(pages=3))
+    try:
+        source.get(1)
+        started, release = threading.Event(), threading.Event()
+        page_text = source._doc.page_text
+
+        def slow_page_text(page_no):
+            started.set()
+            release.wait(10)
+            return page_text(page_no)
+
+        source._doc.page_text = slow_page_text
+        worker = threading.Thread(target=source.get, args=(2,))
+        worker.start()
+        assert started.wait(10)
+        assert marker(1) in source.get(1)
+        assert worker.is_alive()  # page 1 came back while page 2 was still being extracted
+        release.set()
+        worker.join(10)
+        assert marker(2) in source.get(2)
+    finally:
+        release.set()
+        source.close()
+
+
+# ---------- Background extraction ----------
+def run_job(pages, total, **kwargs):
+    batches = []
+    result = {}
+    done = threading.Event()
+
+    def on_done(error):
+        result['error'] = error
+        done.set()
+
+    job = BackgroundExtraction(pages, total, on_batch=batches.append, on_done=on_done, **kwargs)
+    job.start()
+    assert done.wait(10)
+    return job, batches, result['error']
+
+
+def test_background_extraction_hands_back_batches(text_pdf):
+    pdf = text_pdf(pages=7)
+    job, batches, error = run_job(iter_pages(pdf), 7, batch_pages=3, batch_seconds=60)
+    assert error is None
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [page_no for batch in batches for page_no, _text in batch] == list(range(1, 8))
+    assert job.pages_done == 7
+
+
+def test_background_extraction_cancel_and_errors():
+    def endless():
+        page_no = 0
+        while True:
+            page_no += 1
+            if page_no == 3:
+                job.cancel()
+            yield page_no, "text"
+
+    job = None
+    batches = []
+    done = threading.Event()
+    job = BackgroundExtraction(endless(), 100, on_batch=batches.append, on_done=lambda error: done.set(),
+                               batch_pages=1)
+    job.start()
+    assert done.wait(10)
+    assert job.cancelled and job.pages_done == 2
+
+    def broken():
+        yield 1, "text"
+        raise RuntimeError("unreadable page")
+
+    _job, _batches, error = run_job(broken(), 2)
+    assert isinstance(error, RuntimeError)
+
+
+# ---------- Export ----------
+def test_export_format_follows_the_file_name():
+    assert export_format("out.txt") == ("txt", False)
+    assert export_format("out.JSONL") == ("jsonl", False)
+    assert export_format("pages.jsonl.gz") == ("jsonl", True)
+    assert export_format("pages.txt.gz") == ("txt", True)
+
+
+def test_export_jsonl_gz(text_pdf, tmp_path):
+    pdf = text_pdf(pages=3)
+    save_path = str(tmp_path / "pages.jsonl.gz")
+    assert export_pages(iter_pages(pdf), save_path) == 3
+    with gzip.open(save_path, "rt", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [record['page'] for record in records] == [1, 2, 3]
+    assert marker(2) in records[1]['text']
+
+
+def test_export_rejects_unknown_formats(tmp_path):
+    with pytest.raises(ValueError):
+        export_pages(iter([]), str(tmp_path / "out.txt"), fmt="csv")
+
+
+def run_export(pages, save_path, cancel_after=None):
+    done = threading.Event()
+    result = {}
+
+    def on_progress():
+        if cancel_after is not None and job.pages_done >= cancel_after:
+            job.cancel()
+
+    def on_done(error):
+        result['error'] = error
+        done.set()
+
+    job = BackgroundExport(pages, 10, save_path, on_progress, on_done, batch_pages=1)
+    job.start()
+    assert done.wait(10)
+    return job, result['error']
+
+
+def test_background_export_writes_the_file(text_pdf, tmp_path):
+    save_path = str(tmp_path / "out.txt.gz")
+    job, error = run_export(iter_pages(text_pdf(pages=4)), save_path)
+    assert error is None and job.pages_done == 4
+    with gzip.open(save_path, "rt", encoding="utf-8") as f:
+        assert marker(4) in f.read()
+    assert not os.path.exists(save_path + ".part")
+
+
+def test_cancelled_export_removes_the_partial_file(text_pdf, tmp_path):
+    save_path = str(tmp_path / "out.txt")
+    job, error = run_export(iter_pages(text_pdf(pages=10)), save_path, cancel_after=2)
+    assert error is None and job.cancelled
+    assert not os.path.exists(save_path)
+    assert not os.path.exists(save_path + ".part")
+
+
+def test_join_waits_for_the_partial_file_to_go(text_pdf, tmp_path):
+    save_path = str(tmp_path / "out.txt")
+    finished = []
+    job = BackgroundExport(iter_pages(text_pdf(pages=20)), 20, save_path, lambda: None, finished.append,
+                           batch_pages=1)
+    job.start()
+    job.cancel()
+    assert job.join(10)
+    assert finished == [None]
+    assert os.listdir(str(tmp_path)) == ["doc.pdf"]
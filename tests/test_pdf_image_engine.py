@@ -0,0 +1,353 @@
+"""Behaviour of the image engine: deduplicated and incremental extraction,
+the parallel pipeline, filters, page rendering and combining images into a
+PDF with the original pixels."""
+import io
+import json
+import os
+import random
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+Image = pytest.importorskip("PIL.Image")
+
+import PDFImageEngine  # noqa: E402
+from PDFImageEngine import (  # noqa: E402
+    ImageFilter, ImageStore, MANIFEST_NAME, ZipImageStore, combine_images_to_pdf, extract_images_parallel,
+    iter_extract_images, read_image_bytes, render_pages, zip_path_for,
+)
+
+
+def png_bytes(mode, size=(37, 23), seed=0):
+    # Noise makes PIL pick a different row filter per line, which the predictor has to undo
+    rng = random.Random(seed)
+    width, height = size
+    bands = {"L": 1, "RGB": 3, "P": 1}[mode]
+    img = Image.frombytes(mode, size, rng.randbytes(width * height * bands))
+    if mode == "P":
+        img.putpalette(rng.randbytes(768))
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue(), img
+
+
+def make_pdf(path, pages):
+    """Write a PDF with one page per list of image bytes"""
+    doc = fitz.open()
+    for images in pages:
+        page = doc.new_page()
+        for i, data in enumerate(images):
+            page.insert_image(fitz.Rect(0, 60 * i, 50, 60 * i + 50), stream=data)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def logo_pdf(path, pages=3, seed=0):
+    """Every page shows the same small logo, then an image of its own"""
+    logo = png_bytes("RGB", size=(8, 8), seed=100)[0]
+    return make_pdf(path, [[logo, png_bytes("RGB", seed=seed + n)[0]] for n in range(pages)])
+
+
+def stored_files(folder):
+    return sorted(os.path.relpath(os.path.join(root, name), folder)
+                  for root, _dirs, names in os.walk(folder) for name in names if name != MANIFEST_NAME)
+
+
+# ---------- Deduplication ----------
+def test_shared_image_is_stored_once(tmp_path):
+    pdf = logo_pdf(tmp_path / "doc.pdf")
+    out = str(tmp_path / "out")
+    infos = list(iter_extract_images(pdf, out))
+
+    assert [(info['page'], info['index']) for info in infos] == [(1, 1), (1, 2), (2, 1), (2, 2), (3, 1), (3, 2)]
+    assert [info['duplicate'] for info in infos] == [False, False, True, False, True, False]
+    assert len(stored_files(out)) == 4
+    assert infos[2]['path'] == infos[0]['path'] and os.path.exists(infos[0]['path'])
+
+
+def test_identical_images_in_other_pdfs_are_not_stored_again(tmp_path):
+    out = str(tmp_path / "out")
+    with ImageStore(out) as store:
+        list(iter_extract_images(logo_pdf(tmp_path / "a.pdf", pages=2), out, store=store))
+        infos = list(iter_extract_images(logo_pdf(tmp_path / "b.pdf", pages=3), out, store=store))
+
+    assert [info['duplicate'] for info in infos] == [True, True, True, True, True, False]
+    assert len(stored_files(out)) == 4
+
+
+# ---------- Parallel pipeline ----------
+def occurrence(info):
+    return info['page'], info['index'], info['sha256'], info['duplicate']
+
+
+def test_parallel_extraction_matches_serial(tmp_path):
+    pdf = logo_pdf(tmp_path / "doc.pdf", pages=5)
+    serial = list(iter_extract_images(pdf, str(tmp_path / "serial")))
+    parallel = list(extract_images_parallel(pdf, str(tmp_path / "parallel"), workers=2, chunk_pages=1))
+
+    assert [occurrence(info) for info in parallel] == [occurrence(info) for info in serial]
+    assert all(os.path.exists(info['path']) for info in parallel)
+    assert len(stored_files(str(tmp_path / "parallel"))) == 6
+
+
+def test_shared_image_is_decoded_by_one_range_only(tmp_path, monkeypatch):
+    decoded = []
+    extract_page_range = PDFImageEngine._extract_page_range
+
+    def spy(*args):
+        occurrences = extract_page_range(*args)
+        decoded.extend(xref for _page, _index, xref, _ext, data in occurrences if data is not None)
+        return occurrences
+
+    # Threads instead of processes, so the spy sees every range
+    monkeypatch.setattr(PDFImageEngine, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(PDFImageEngine, "_extract_page_range", spy)
+    pdf = logo_pdf(tmp_path / "doc.pdf", pages=4)
+    infos = list(extract_images_parallel(pdf, str(tmp_path / "out"), workers=1, chunk_pages=1))
+
+    assert len(infos) == 8
+    assert len(decoded) == len(set(decoded)) == 5  # the logo plus one image per page
+
+
+# ---------- Combining ----------
+def write_images(folder, images):
+    paths = []
+    for name, data in images:
+        path = folder / name
+        path.write_bytes(data)
+        paths.append(str(path))
+    return paths
+
+
+def page_pixels(doc, page_no):
+    xref = doc[page_no].get_images()[0][0]
+    pix = fitz.Pixmap(doc, xref)
+    return pix.n, pix.samples
+
+
+def test_batches_repeats_and_missing_files(tmp_path):
+    images = [(f"{i}.png", png_bytes("RGB", seed=i)[0]) for i in range(5)]
+    paths = write_images(tmp_path, images)
+    paths = paths + paths[:2] + [str(tmp_path / "missing.png")]
+
+    assert combine_images_to_pdf(paths, str(tmp_path / "out.pdf"), batch_size=2) == 7
+    with fitz.open(str(tmp_path / "out.pdf")) as doc:
+        assert len(doc) == 7
+        assert page_pixels(doc, 5) == page_pixels(doc, 0)
+        assert page_pixels(doc, 0)[1] == png_bytes("RGB", seed=0)[1].tobytes()
+    assert not os.path.exists(str(tmp_path / "out.pdf.part"))
+
+
+def test_nothing_to_combine_writes_nothing(tmp_path):
+    assert combine_images_to_pdf([str(tmp_path / "missing.png")], str(tmp_path / "out.pdf")) == 0
+    assert os.listdir(str(tmp_path)) == []
+
+
+@pytest.mark.parametrize("mode", ["L", "RGB", "P"])
+def test_png_passthrough_keeps_pixels(tmp_path, mode):
+    data, img = png_bytes(mode)
+    paths = write_images(tmp_path, [(f"{mode}.png", data)])
+    report = {}
+
+    assert combine_images_to_pdf(paths, str(tmp_path / "out.pdf"), report=report) == 1
+    assert report == {'passthrough': 1}
+    with fitz.open(str(tmp_path / "out.pdf")) as doc:
+        n, samples = page_pixels(doc, 0)
+    assert samples == img.convert("L" if n == 1 else "RGB").tobytes()
+
+
+def test_jpeg_is_embedded_unchanged(tmp_path):
+    buf = io.BytesIO()
+    png_bytes("RGB")[1].save(buf, "JPEG")
+    paths = write_images(tmp_path, [("photo.jpg", buf.getvalue())])
+
+    combine_images_to_pdf(paths, str(tmp_path / "out.pdf"))
+    with fitz.open(str(tmp_path / "out.pdf")) as doc:
+        xref = doc[0].get_images()[0][0]
+        assert doc.xref_stream_raw(xref) == buf.getvalue()
+
+
+def test_transparent_png_is_decoded(tmp_path):
+    img = Image.new("RGBA", (8, 8), (10, 20, 30, 128))
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    report = {}
+    combine_images_to_pdf(write_images(tmp_path, [("alpha.png", buf.getvalue())]), str(tmp_path / "out.pdf"),
+                          report=report)
+    assert report == {'decoded': 1}
+
+
+# ---------- ZIP output ----------
+def test_zip_store_holds_stored_images_and_the_manifest(tmp_path):
+    pdf = logo_pdf(tmp_path / "doc.pdf")
+    zip_path = zip_path_for(pdf, str(tmp_path / "out"))
+    with ZipImageStore(zip_path) as store:
+        infos = list(iter_extract_images(pdf, str(tmp_path / "out"), store=store))
+
+    assert zip_path == str(tmp_path / "out" / "doc_images.zip")
+    with zipfile.ZipFile(zip_path) as zf:
+        members = zf.infolist()
+        manifest = [json.loads(line) for line in zf.read(MANIFEST_NAME).decode("utf-8").splitlines()]
+    assert members[-1].filename == MANIFEST_NAME
+    assert len(members) == 5
+    assert all(member.compress_type == zipfile.ZIP_STORED for member in members[:-1])
+    assert sum(record['type'] == "occurrence" for record in manifest) == 6
+    assert read_image_bytes(infos[1]['path']) == fitz.open(pdf).extract_image(infos[1]['xref'])['image']
+
+
+def test_combine_reads_images_from_a_zip_store(tmp_path):
+    images = [(f"{i}.png", png_bytes("RGB", seed=i)[0]) for i in range(3)]
+    combine_images_to_pdf(write_images(tmp_path, images), str(tmp_path / "source.pdf"))
+
+    with ZipImageStore(str(tmp_path / "images.zip")) as store:
+        infos = list(iter_extract_images(str(tmp_path / "source.pdf"), str(tmp_path), store=store))
+
+    assert combine_images_to_pdf([info['path'] for info in infos], str(tmp_path / "again.pdf")) == 3
+    with fitz.open(str(tmp_path / "again.pdf")) as doc:
+        assert page_pixels(doc, 1)[1] == png_bytes("RGB", seed=1)[1].tobytes()
+
+
+# ---------- Filters ----------
+def pages_and_indexes(pdf, out, image_filter):
+    return [(info['page'], info['index']) for info in iter_extract_images(pdf, out, image_filter=image_filter)]
+
+
+def test_filter_by_size_and_page_range(tmp_path):
+    pdf = logo_pdf(tmp_path / "doc.pdf", pages=4)
+    # Indexes keep counting the skipped logo, so file names do not depend on the filter
+    assert pages_and_indexes(pdf, str(tmp_path / "big"), ImageFilter(min_width=16)) == [
+        (1, 2), (2, 2), (3, 2), (4, 2)]
+    assert pages_and_indexes(pdf, str(tmp_path / "range"), ImageFilter(first_page=2, last_page=3)) == [
+        (2, 1), (2, 2), (3, 1), (3, 2)]
+    assert ImageFilter(first_page=0, last_page=99).page_range(4) == (1, 4)
+
+
+def test_filter_by_colorspace(tmp_path):
+    pdf = make_pdf(tmp_path / "doc.pdf", [[png_bytes("L")[0], png_bytes("RGB")[0]]])
+    assert pages_and_indexes(pdf, str(tmp_path / "gray"), ImageFilter(colorspaces=["Gray"])) == [(1, 1)]
+    assert pages_and_indexes(pdf, str(tmp_path / "rgb"), ImageFilter(colorspaces=["RGB"])) == [(1, 2)]
+    assert pages_and_indexes(pdf, str(tmp_path / "cmyk"), ImageFilter(colorspaces=["CMYK"])) == []
+
+
+def test_colorspace_components_of_palette_and_spot_colour_images():
+    doc = fitz.open()
+    page = doc.new_page()
+    profile = doc.get_new_xref()
+    doc.update_object(profile, "<< /N 3 >>")
+    doc.update_stream(profile, b"profile")
+    tint = "<< /FunctionType 2 /Domain [0 1] /C0 [0 0 0 0] /C1 [0 0 0 1] /N 1 >>"
+    expected = {
+        "[/Indexed /DeviceRGB 1 <ff000000ff00>]": 3,
+        "[/Indexed /DeviceGray 1 <00ff>]": 1,
+        f"[/Indexed [/ICCBased {profile} 0 R] 1 <ff000000ff00>]": 3,
+        f"[/Separation /Spot /DeviceCMYK {tint}]": 1,
+        f"[/DeviceN [/Cyan /Magenta /Spot] /DeviceCMYK {tint}]": 3,
+    }
+    for colorspace in expected:
+        xref = doc.get_new_xref()
+        doc.update_object(xref, f"<< /Type /XObject /Subtype /Image /Width 1 /Height 1 "
+                                f"/ColorSpace {colorspace} /BitsPerComponent 8 >>")
+        doc.update_stream(xref, bytes(3))
+        page.insert_image(fitz.Rect(0, 0, 10, 10), xref=xref)
+
+    images = page.get_images(full=True)
+    assert [img[5] for img in images] == ["Indexed", "Indexed", "Indexed", "Separation", "DeviceN"]
+    assert [PDFImageEngine._colorspace_components(doc, img[0], img[5]) for img in images] == list(expected.values())
+
+
+def test_filter_skips_masks(tmp_path):
+    buf = io.BytesIO()
+    Image.new("RGBA", (20, 20), (10, 20, 30, 128)).save(buf, "PNG")
+    doc = fitz.open()
+    page = doc.new_page()
+    xref = page.insert_image(fitz.Rect(0, 0, 50, 50), stream=buf.getvalue())
+    smask = int(doc.xref_get_key(xref, "SMask")[1].split()[0])
+    page.insert_image(fitz.Rect(60, 0, 110, 50), xref=smask)  # the mask drawn on its own as well
+    pdf = str(tmp_path / "doc.pdf")
+    doc.save(pdf)
+    doc.close()
+
+    assert len(pages_and_indexes(pdf, str(tmp_path / "all"), ImageFilter())) == 2
+    assert len(pages_and_indexes(pdf, str(tmp_path / "masks"), ImageFilter(skip_masks=True))) == 1
+
+
+def test_filter_signature_is_json_friendly():
+    signature = ImageFilter(min_width=10, colorspaces=["RGB", "Gray"]).signature()
+    assert json.loads(json.dumps(signature)) == signature
+    assert signature['colorspaces'] == [1, 3] and signature['min_width'] == 10
+
+
+# ---------- Incremental runs ----------
+def test_rerun_is_answered_from_the_manifest(tmp_path, monkeypatch):
+    pdf = logo_pdf(tmp_path / "doc.pdf")
+    out = str(tmp_path / "out")
+    first = list(iter_extract_images(pdf, out))
+
+    monkeypatch.setattr(fitz, "open", lambda *args: pytest.fail("complete run was extracted again"))
+    again = list(iter_extract_images(pdf, out))
+    assert [info['filename'] for info in again] == [info['filename'] for info in first]
+    assert all(info['reused'] for info in again)
+
+
+def test_interrupted_run_only_decodes_what_is_missing(tmp_path):
+    pdf = logo_pdf(tmp_path / "doc.pdf")
+    out = str(tmp_path / "out")
+    infos = iter_extract_images(pdf, out)
+    next(infos)
+    next(infos)
+    infos.close()
+
+    again = list(iter_extract_images(pdf, out))
+    assert [info['reused'] for info in again] == [True, True, False, False, False, False]
+    assert len(again) == 6 and len(stored_files(out)) == 4
+
+
+def test_changed_filter_or_file_runs_again(tmp_path):
+    pdf = logo_pdf(tmp_path / "doc.pdf")
+    out = str(tmp_path / "out")
+    list(iter_extract_images(pdf, out, image_filter=ImageFilter(min_width=16)))
+
+    again = list(iter_extract_images(pdf, out))
+    assert [info['reused'] for info in again] == [False, True, False, True, False, True]
+
+    logo_pdf(tmp_path / "doc.pdf", pages=2, seed=10)
+    changed = list(iter_extract_images(pdf, out))
+    assert not any(info['reused'] for info in changed)
+    # New images of each version of the PDF go to a folder of its own
+    assert changed[0]['duplicate'] and not changed[1]['duplicate']
+    assert changed[1]['filename'].split("/")[0] != again[1]['filename'].split("/")[0]
+
+
+# ---------- Rendering ----------
+def test_render_pages_in_order(tmp_path):
+    pdf = logo_pdf(tmp_path / "scan.pdf", pages=5)
+    report = {}
+    infos = list(render_pages(pdf, str(tmp_path / "out"), dpi=30, workers=2, chunk_pages=2, report=report))
+
+    assert [info['page'] for info in infos] == [1, 2, 3, 4, 5]
+    assert report['pages'] == 5
+    assert infos[0]['filename'] == "scan_pages/page_0001.png"
+    with Image.open(infos[0]['path']) as img:
+        assert img.format == "PNG" and img.mode == "RGB"
+
+
+def test_render_gray_jpeg_page_range(tmp_path):
+    pdf = logo_pdf(tmp_path / "scan.pdf", pages=5)
+    infos = list(render_pages(pdf, str(tmp_path / "out"), dpi=30, colorspace="Gray", fmt="jpeg",
+                              first_page=2, last_page=3, workers=1))
+
+    assert [info['page'] for info in infos] == [2, 3]
+    with Image.open(infos[1]['path']) as img:
+        assert img.format == "JPEG" and img.mode == "L"
+    assert infos[1]['path'].endswith("page_0003.jpg")
+
+
+def test_render_rejects_unknown_options(tmp_path):
+    pdf = logo_pdf(tmp_path / "scan.pdf", pages=1)
+    with pytest.raises(ValueError):
+        list(render_pages(pdf, str(tmp_path / "out"), fmt="gif"))
+    with pytest.raises(ValueError):
+        list(render_pages(pdf, str(tmp_path / "out"), colorspace="CMYK"))
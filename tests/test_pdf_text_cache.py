@@ -0,0 +1,72 @@
+"""PageTextCache: hit/miss counters, persistence and LRU eviction."""
+import os
+
+import PDFTextCache
+from PDFTextCache import PageTextCache, document_key, file_digest
+
+
+def test_hits_and_misses(tmp_path):
+    cache = PageTextCache(str(tmp_path / "pages.sqlite3"))
+    assert cache.get("doc", 1) is None
+    cache.put("doc", 1, "hello")
+    assert cache.get("doc", 1) == "hello"
+    assert cache.get("doc", 2) is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+    assert stats['bytes'] == len("hello")
+    cache.close()
+
+
+def test_entries_survive_a_reopen(tmp_path):
+    path = str(tmp_path / "pages.sqlite3")
+    cache = PageTextCache(path)
+    cache.put("doc", 1, "kept")
+    cache.put_page_count("doc", 12)
+    cache.close()
+
+    cache = PageTextCache(path)
+    assert cache.get("doc", 1) == "kept"
+    assert cache.get_page_count("doc") == 12
+    assert cache.total_bytes == len("kept")
+    cache.close()
+
+
+def test_least_recently_used_pages_are_evicted(tmp_path):
+    cache = PageTextCache(str(tmp_path / "pages.sqlite3"), max_bytes=250)
+    for page_no in range(1, 5):
+        cache.put("doc", page_no, "x" * 50)
+    cache.get("doc", 1)  # page 1 is now the most recently used
+
+    cache.put("doc", 5, "y" * 100)  # 300 bytes: evict down to 90% of 250
+    assert cache.total_bytes <= 225
+    assert cache.get("doc", 1) is not None
+    assert cache.get("doc", 2) is None
+    assert cache.get("doc", 5) is not None
+    assert cache.stats()['evictions'] >= 2
+    cache.close()
+
+
+def test_keys(tmp_path):
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"same bytes")
+    copy = tmp_path / "b.bin"
+    copy.write_bytes(b"same bytes")
+    assert file_digest(str(path)) == file_digest(str(copy))
+    assert document_key("abc", "pymupdf") != document_key("abc", "pypdf2")
+
+
+def test_document_hash_is_remembered_while_the_file_is_unchanged(tmp_path, monkeypatch):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"first version")
+    hashed = []
+    monkeypatch.setattr(PDFTextCache, "file_digest", lambda name: hashed.append(name) or file_digest(name))
+    cache = PageTextCache(str(tmp_path / "pages.sqlite3"))
+    first = cache.document_hash(str(path))
+    assert cache.document_hash(str(path)) == first
+    assert len(hashed) == 1
+
+    path.write_bytes(b"second version")
+    os.utime(str(path), (1, 1))
+    assert cache.document_hash(str(path)) != first
+    assert len(hashed) == 2
+    cache.close()
@@ -0,0 +1,76 @@
+"""PDFTextIndex: incremental indexing, search and pruning."""
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip("PyPDF2")
+
+from PDFTextIndex import PDFTextIndex  # noqa: E402
+
+
+@pytest.fixture
+def folder(tmp_path, text_pdf):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    shutil.move(text_pdf("one.pdf", pages=2), str(docs / "one.pdf"))
+    shutil.move(text_pdf("two.pdf", pages=3), str(docs / "two.pdf"))
+    return docs
+
+
+def test_add_and_search(folder, tmp_path):
+    index = PDFTextIndex(str(tmp_path / "index.sqlite3"))
+    assert index.add_paths([str(folder)]) == (2, 0, 0)
+    hits = index.search("marker3")
+    assert [(os.path.basename(path), page_no) for path, page_no, _snippet in hits] == [("two.pdf", 3)]
+    assert "[marker3]" in hits[0][2]
+    assert index.stats() == {'files': 2, 'documents': 2, 'pages': 5}
+    index.close()
+
+
+def test_rerun_skips_unchanged_files_without_reading_them(folder, tmp_path, monkeypatch):
+    index = PDFTextIndex(str(tmp_path / "index.sqlite3"))
+    index.add_paths([str(folder)])
+
+    import PDFTextIndex as module
+    monkeypatch.setattr(module, "file_digest", lambda path: pytest.fail("unchanged file was hashed"))
+    assert index.add_paths([str(folder)]) == (0, 2, 0)
+    index.close()
+
+
+def test_changed_file_replaces_its_pages(folder, tmp_path, text_pdf):
+    index = PDFTextIndex(str(tmp_path / "index.sqlite3"))
+    index.add_paths([str(folder)])
+
+    # two.pdf now has the content of a one-page document
+    shutil.move(text_pdf("new.pdf", pages=1), str(folder / "two.pdf"))
+    assert index.add_paths([str(folder)]) == (1, 1, 0)
+    assert index.search("marker3") == []
+    assert index.stats()['pages'] == 3
+    index.close()
+
+
+def test_copies_share_a_document_until_the_last_one_goes(folder, tmp_path):
+    shutil.copy(str(folder / "one.pdf"), str(folder / "copy.pdf"))
+    index = PDFTextIndex(str(tmp_path / "index.sqlite3"))
+    assert index.add_paths([str(folder)]) == (2, 1, 0)
+    assert index.stats()['documents'] == 2
+
+    os.remove(str(folder / "one.pdf"))
+    assert index.remove_missing() == 1
+    assert len(index.search("marker1")) == 2  # copy.pdf and two.pdf
+    os.remove(str(folder / "copy.pdf"))
+    index.remove_missing()
+    assert index.stats() == {'files': 1, 'documents': 1, 'pages': 3}
+    index.close()
+
+
+def test_unreadable_pdf_is_reported_and_skipped(folder, tmp_path):
+    (folder / "bad.pdf").write_bytes(b"not a pdf")
+    reported = []
+    index = PDFTextIndex(str(tmp_path / "index.sqlite3"))
+    counts = index.add_paths([str(folder)], on_file=lambda *args: reported.append(args))
+    assert counts == (2, 0, 1)
+    bad = [args for args in reported if args[0].endswith("bad.pdf")]
+    assert len(bad) == 1 and bad[0][2] is not None
+    index.close()
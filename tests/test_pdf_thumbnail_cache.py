@@ -0,0 +1,107 @@
+"""ThumbnailCache and ThumbnailLoader: scale once, reuse from memory and
+disk, evict the least recently used files."""
+import os
+import random
+import threading
+
+import pytest
+
+pytest.importorskip("fitz")
+Image = pytest.importorskip("PIL.Image")
+
+from PDFThumbnailCache import ThumbnailCache, ThumbnailLoader  # noqa: E402
+
+
+def noise(size=(200, 100), seed=0):
+    rng = random.Random(seed)
+    return Image.frombytes("RGB", size, rng.randbytes(size[0] * size[1] * 3))
+
+
+def noise_image(path, size=(200, 100), seed=0):
+    noise(size, seed).save(str(path), "PNG")
+    return str(path)
+
+
+def test_thumbnail_is_scaled_once_and_reused(tmp_path):
+    image = noise_image(tmp_path / "image.png")
+    cache = ThumbnailCache(str(tmp_path / "thumbs"))
+    assert cache.get("abc", 64) is None
+
+    thumb = cache.get_or_create("abc", 64, image)
+    assert thumb.size == (64, 32)
+    assert cache.get_or_create("abc", 64, image) is thumb  # from memory
+    assert cache.stats()['misses'] == 2 and cache.stats()['hits'] == 1
+
+    # A new cache finds the PNG on disk; the source image is not needed any more
+    os.remove(image)
+    again = ThumbnailCache(str(tmp_path / "thumbs"))
+    assert again.get_or_create("abc", 64, image).size == (64, 32)
+    assert again.stats()['bytes'] == cache.stats()['bytes'] > 0
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    folder = str(tmp_path / "thumbs")
+    cache = ThumbnailCache(folder, keep_in_memory=0)
+    thumbs = [noise((32, 32), seed) for seed in range(3)]
+    cache.put("a", 32, thumbs[0])
+    one_file = cache.stats()['bytes']
+    cache.put("b", 32, thumbs[1])
+    os.utime(os.path.join(folder, "a_32.png"), (1, 1))
+    os.utime(os.path.join(folder, "b_32.png"), (2, 2))
+
+    cache.max_bytes = int(one_file * 2.5)
+    cache.put("c", 32, thumbs[2])
+    assert sorted(os.listdir(folder)) == ["b_32.png", "c_32.png"]
+    assert cache.get("a", 32) is None
+    assert cache.get("b", 32) is not None
+
+
+def test_rewriting_a_thumbnail_keeps_the_size_count_right(tmp_path):
+    folder = str(tmp_path / "thumbs")
+    cache = ThumbnailCache(folder)
+    for seed in range(3):
+        cache.put("a", 32, noise((32, 32), seed))
+    assert cache.stats()['bytes'] == os.path.getsize(os.path.join(folder, "a_32.png"))
+
+
+def test_concurrent_writes_of_one_thumbnail(tmp_path):
+    folder = str(tmp_path / "thumbs")
+    cache = ThumbnailCache(folder)
+    thumbs = [noise((32, 32), seed) for seed in range(8)]
+    errors = []
+
+    def put(thumb):
+        try:
+            for _ in range(10):
+                cache.put("a", 32, thumb)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put, args=(thumb,)) for thumb in thumbs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert os.listdir(folder) == ["a_32.png"]
+    assert cache.stats()['bytes'] == os.path.getsize(os.path.join(folder, "a_32.png"))
+
+
+def test_loader_hands_back_thumbnails(tmp_path):
+    image = noise_image(tmp_path / "image.png")
+    ready = {}
+    done = threading.Event()
+
+    def on_ready(key, thumb):
+        ready[key] = thumb
+        if len(ready) == 2:
+            done.set()
+
+    loader = ThumbnailLoader(ThumbnailCache(str(tmp_path / "thumbs")), on_ready)
+    try:
+        loader.request([("row1", "abc", image), ("row2", "def", str(tmp_path / "missing.png"))], 48)
+        assert done.wait(10)
+    finally:
+        loader.stop()
+    assert ready['row1'].size == (48, 24)
+    assert ready['row2'] is None
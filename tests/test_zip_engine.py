@@ -0,0 +1,257 @@
+"""Round-trip checks for ZipEngine: the hand-written headers, spliced deflate
+chunks and raw member copies must always read back as an ordinary zip."""
+import os
+import random
+import zipfile
+
+import pytest
+
+import ZipEngine
+from ZipEngine import (
+    CompressionPolicy, JobCancelled, ParallelZipWriter, ZipJob, create_zip, extract_zip, format_progress,
+)
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def text_bytes(size, seed=0):
+    # Compressible but not trivially so, like real documents
+    rng = random.Random(seed)
+    words = [b"alpha", b"beta", b"gamma", b"delta", b"epsilon", b"zeta"]
+    out = bytearray()
+    while len(out) < size:
+        out += rng.choice(words) + b" "
+    return bytes(out[:size])
+
+
+def archive_contents(zip_path):
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        return {info.filename: zf.read(info) for info in zf.infolist()}
+
+
+def folder_contents(folder):
+    contents = {}
+    for root, _dirs, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                contents[os.path.relpath(path, folder).replace(os.sep, "/")] = f.read()
+    return contents
+
+
+@pytest.fixture
+def tree(tmp_path):
+    src = tmp_path / "src"
+    write(str(src / "empty.txt"), b"")
+    write(str(src / "small.txt"), b"hello zip\n")
+    write(str(src / "big.txt"), text_bytes(2 * 1024 * 1024 + 12345))
+    write(str(src / "photo.jpg"), random.Random(1).randbytes(200 * 1024))
+    write(str(src / "sub" / "nested.txt"), text_bytes(5000, seed=2))
+    return src
+
+
+# ---------- Writing ----------
+def test_create_zip_round_trip(tree, tmp_path):
+    zip_path = str(tmp_path / "out.zip")
+    counts = create_zip([str(tree)], zip_path, workers=3)
+
+    assert archive_contents(zip_path) == {"src/" + name: data for name, data in folder_contents(str(tree)).items()}
+    assert counts['files'] == 5
+    assert not os.path.exists(zip_path + ".part")
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.getinfo("src/empty.txt").file_size == 0
+
+
+def test_small_chunks_splice_into_one_deflate_stream(tmp_path):
+    data = text_bytes(300 * 1024, seed=3)
+    write(str(tmp_path / "data.txt"), data)
+    zip_path = str(tmp_path / "out.zip")
+
+    with ParallelZipWriter(zip_path, workers=4, chunk_size=16 * 1024) as writer:
+        writer.add_file(str(tmp_path / "data.txt"), "data.txt")
+
+    assert archive_contents(zip_path) == {"data.txt": data}
+
+
+def test_compressed_files_are_stored(tree, tmp_path):
+    zip_path = str(tmp_path / "out.zip")
+    counts = create_zip([str(tree)], zip_path)
+
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.getinfo("src/photo.jpg").compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo("src/big.txt").compress_type == zipfile.ZIP_DEFLATED
+    assert counts['stored'] == 1
+
+
+def test_compression_policy():
+    policy = CompressionPolicy()
+    assert policy.method_for("holiday.JPG", b"") == zipfile.ZIP_STORED
+    assert policy.method_for("export.bin", b"\x89PNG\r\n\x1a\n" + bytes(100)) == zipfile.ZIP_STORED
+    assert policy.method_for("noise.bin", random.Random(4).randbytes(64 * 1024)) == zipfile.ZIP_STORED
+    assert policy.method_for("notes.txt", text_bytes(100)) == zipfile.ZIP_DEFLATED
+    assert policy.method_for("log.bin", text_bytes(64 * 1024)) == zipfile.ZIP_DEFLATED
+    with pytest.raises(ValueError):
+        CompressionPolicy("tiny")
+
+
+# ---------- Progress and cancellation ----------
+class CancelAfter(ZipJob):
+    """A job that cancels itself once `files` files are done"""
+
+    def __init__(self, files):
+        super().__init__()
+        self.after = files
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        if self.files_done >= self.after:
+            self.cancel()
+
+
+def test_job_progress():
+    mb = 1024 * 1024
+    job = ZipJob()
+    job.set_totals(4 * mb, 4)
+    job.update(bytes_in=mb, bytes_out=mb // 2, files=1)
+    snapshot = job.snapshot()
+    assert snapshot['bytes_done'] == mb and snapshot['percent'] == 25.0
+    assert snapshot['files_done'] == 1
+
+    snapshot.update(mb_per_sec=2.0, eta=90.0)
+    assert format_progress(snapshot) == "1.0 / 4.0 MB, 1 / 4 files, 2.0 MB/s, 1:30 left"
+    assert format_progress(dict(snapshot, eta=None)).endswith("2.0 MB/s")
+
+
+def test_create_zip_reports_progress(tree, tmp_path):
+    job = ZipJob()
+    create_zip([str(tree)], str(tmp_path / "out.zip"), job=job)
+    snapshot = job.snapshot()
+    assert job.finished
+    assert snapshot['files_done'] == snapshot['total_files'] == 5
+    assert snapshot['percent'] == 100.0
+
+
+def test_cancelled_create_zip_leaves_nothing(tree, tmp_path):
+    zip_path = str(tmp_path / "out.zip")
+    with pytest.raises(JobCancelled):
+        create_zip([str(tree)], zip_path, workers=2, job=CancelAfter(2))
+    assert not os.path.exists(zip_path)
+    assert not os.path.exists(zip_path + ".part")
+
+
+# ---------- Extraction ----------
+@pytest.fixture
+def extracted(tree, tmp_path):
+    """An archive of the tree, extracted once and then edited"""
+    zip_path = str(tmp_path / "out.zip")
+    create_zip([str(tree)], zip_path)
+    dest = tmp_path / "dest"
+    extract_zip(zip_path, str(dest))
+
+    write(str(dest / "src" / "small.txt"), b"local edit")
+    os.remove(str(dest / "src" / "big.txt"))
+    return zip_path, dest
+
+
+def test_extract_round_trip(tree, tmp_path):
+    zip_path = str(tmp_path / "out.zip")
+    create_zip([str(tree)], zip_path)
+    counts = extract_zip(zip_path, str(tmp_path / "dest"), workers=3)
+    assert counts == {'written': 5, 'skipped': 0}
+    assert folder_contents(str(tmp_path / "dest" / "src")) == folder_contents(str(tree))
+
+
+def test_overwrite_always(tree, extracted):
+    zip_path, dest = extracted
+    assert extract_zip(zip_path, str(dest), overwrite="always") == {'written': 5, 'skipped': 0}
+    assert folder_contents(str(dest / "src")) == folder_contents(str(tree))
+
+
+def test_overwrite_if_changed(tree, extracted):
+    zip_path, dest = extracted
+    assert extract_zip(zip_path, str(dest), overwrite="if-changed") == {'written': 2, 'skipped': 3}
+    assert folder_contents(str(dest / "src")) == folder_contents(str(tree))
+
+
+def test_overwrite_never(tree, extracted):
+    zip_path, dest = extracted
+    assert extract_zip(zip_path, str(dest), overwrite="never") == {'written': 1, 'skipped': 4}
+    with open(str(dest / "src" / "small.txt"), "rb") as f:
+        assert f.read() == b"local edit"
+    assert (dest / "src" / "big.txt").exists()
+
+
+def test_failed_overwrite_keeps_the_existing_files(extracted, monkeypatch):
+    zip_path, dest = extracted
+    before = folder_contents(str(dest))
+
+    def full_disk(path, mode="r", *args, **kwargs):
+        if "w" in mode and "small.txt" in path:
+            raise OSError(28, "No space left on device", path)
+        return open(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr(ZipEngine, "open", full_disk, raising=False)
+    with pytest.raises(OSError):
+        extract_zip(zip_path, str(dest), overwrite="always", workers=1)
+    monkeypatch.undo()
+    assert folder_contents(str(dest)) == before
+
+
+def test_unknown_overwrite_policy(tmp_path):
+    with pytest.raises(ValueError):
+        extract_zip(str(tmp_path / "missing.zip"), str(tmp_path), overwrite="sometimes")
+
+
+def test_cancelled_extract_removes_what_it_created(tree, tmp_path):
+    zip_path = str(tmp_path / "out.zip")
+    create_zip([str(tree)], zip_path)
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    write(str(dest / "keep.txt"), b"already here")
+
+    with pytest.raises(JobCancelled):
+        extract_zip(zip_path, str(dest), workers=1, job=CancelAfter(2))
+    assert folder_contents(str(dest)) == {"keep.txt": b"already here"}
+    assert os.listdir(str(dest)) == ["keep.txt"]
+
+
+# ---------- Update mode ----------
+def test_update_copies_unchanged_members(tree, tmp_path, monkeypatch):
+    zip_path = str(tmp_path / "out.zip")
+    create_zip([str(tree)], zip_path)
+
+    # touched: same bytes, new mtime; changed: same size, new bytes
+    touched = str(tree / "big.txt")
+    stat = os.stat(touched)
+    os.utime(touched, (stat.st_atime, stat.st_mtime + 3600))
+    write(str(tree / "small.txt"), b"HELLO ZIP\n")
+    # zip timestamps have 2 s resolution; make the edit visible like a later save would
+    os.utime(str(tree / "small.txt"), (stat.st_atime, stat.st_mtime + 10))
+    write(str(tree / "added.txt"), b"new file")
+    os.remove(str(tree / "sub" / "nested.txt"))
+
+    deflated = []
+    deflate_chunk = ZipEngine._deflate_chunk
+    monkeypatch.setattr(ZipEngine, "_deflate_chunk", lambda data, *args: deflated.append(data) or deflate_chunk(data, *args))
+    counts = create_zip([str(tree)], zip_path, update=True)
+
+    # Only the changed and the added file went through the compressor
+    assert sorted(deflated) == [b"HELLO ZIP\n", b"new file"]
+    assert counts['added'] == ["src/added.txt"]
+    assert counts['changed'] == ["src/small.txt"]
+    assert counts['removed'] == ["src/sub/nested.txt"]
+    assert counts['copied'] == 3  # empty.txt, big.txt (touched) and photo.jpg
+    assert archive_contents(zip_path) == {"src/" + name: data for name, data in folder_contents(str(tree)).items()}
+
+
+def test_update_without_an_archive_builds_one(tree, tmp_path):
+    zip_path = str(tmp_path / "out.zip")
+    counts = create_zip([str(tree)], zip_path, update=True)
+    assert counts['copied'] == 0
+    assert len(counts['added']) == 5
+    assert len(archive_contents(zip_path)) == 5